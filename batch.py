@@ -0,0 +1,150 @@
+"""Headless batch analysis of a directory of Millikan experiment videos.
+
+Example:
+    python batch.py sample_data --rois rois.csv --output results.csv
+
+The ROI file is a CSV with the columns video,x,y,w,h where video is the file name
+and the box is given in the 512x512 display coordinates used by the application.
+A video may appear on several rows, one per droplet; all of its droplets are tracked
+in a single pass over the video and get one results row each. With --auto-roi the
+droplets of videos without ROIs are found automatically:
+    python batch.py sample_data --auto-roi --output results.csv
+"""
+import argparse
+import csv
+import os
+from multiprocessing import Pool, cpu_count
+import cv2
+from components import ChargeCalculator, ElementaryChargeEstimator, ResultsStore, TRACKERS, VideoAnalyzer
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov')
+RESULT_FIELDS = ['video', 'droplet', 'x', 'y', 'w', 'h', 'tracker', 'crop', 'frames_tracked', 'slope_up', 'slope_down',
+                 'vu', 'vd', 'charge', 'integer', 'charge_low', 'charge_high', 'integer_low', 'integer_high', 'error']
+
+def load_rois(path):
+    """Read per-video ROIs from a CSV file into a dict of video name -> list of (x, y, w, h), in file order."""
+    rois = {}
+    with open(path, newline='') as f:
+        for record in csv.DictReader(f):
+            rois.setdefault(record['video'], []).append(tuple(int(float(record[key])) for key in ('x', 'y', 'w', 'h')))
+    return rois
+
+def init_worker():
+    # Each process already owns a core, so keep OpenCV from spawning its own thread pool
+    cv2.setNumThreads(1)
+
+def analyze_video(job):
+    video_path, bboxes, tracker_name, crop, use_cache, max_droplets, stride, max_stride, proxy, bootstrap, calibration = job
+    analyzer = VideoAnalyzer(tracker_name=tracker_name, crop=crop, use_cache=use_cache, stride=stride, max_stride=max_stride,
+                             use_proxy=proxy is not None, proxy_grayscale=proxy == 'gray', bootstrap=bootstrap,
+                             calibration=calibration)
+    if bboxes is None:
+        # Detected in the worker, so detection runs in parallel like the tracking
+        try:
+            bboxes = analyzer.detect_rois(video_path, max_droplets)
+        except (ValueError, cv2.error) as e:
+            return [{'video': os.path.basename(video_path), 'droplet': '', 'error': str(e).strip()}]
+        if not bboxes:
+            return [{'video': os.path.basename(video_path), 'droplet': '', 'error': "No droplet was detected"}]
+    return analyzer.analyze_many(video_path, bboxes)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Track droplets and compute charges for every video in a directory.")
+    parser.add_argument('directory', help="Directory containing the experiment videos")
+    parser.add_argument('--rois', help="CSV file with columns video,x,y,w,h")
+    parser.add_argument('--auto-roi', action='store_true', help="Detect the droplets of videos that have no ROI in --rois")
+    parser.add_argument('--max-droplets', type=int, default=3, help="Most droplets to track per video with --auto-roi (default: 3)")
+    parser.add_argument('--output', default='results.csv', help="CSV file to write one results row per droplet to")
+    parser.add_argument('--tracker', default='CSRT', type=str.upper, choices=list(TRACKERS), help="Tracker backend (default: CSRT)")
+    parser.add_argument('--crop', action='store_true', help="Track inside a native-resolution window around the ROI")
+    parser.add_argument('--no-cache', action='store_true', help="Track again even if output/<video>/ holds a trajectory for the same ROI and tracker")
+    parser.add_argument('--stride', type=int, default=1, help="Track every k-th frame and only grab the rest (default: 1)")
+    parser.add_argument('--max-stride', type=int, help="Let the stride double up to this while the droplets move steadily")
+    parser.add_argument('--proxy', action='store_true', help="Decode each video once into a memory-mapped frame proxy in output/<video>/ and read the frames from it")
+    parser.add_argument('--proxy-gray', action='store_true', help="Keep the frame proxy in grayscale, a third of the size (implies --proxy)")
+    parser.add_argument('--bootstrap', type=int, default=0, metavar='N', help="Add 95%% intervals of the charge and q/e from N bootstrap resamples (e.g. 1000)")
+    parser.add_argument('--pixels-mm', type=float, help="Calibration of the videos in pixels per mm (default: 414.20)")
+    parser.add_argument('--fps', type=float, help="Frame rate the videos were recorded at (default: 30)")
+    parser.add_argument('--temperature', type=float, help="Room temperature in degrees C (default: 20)")
+    parser.add_argument('--pressure', type=float, help="Air pressure in Torr (default: 760)")
+    parser.add_argument('--voltage', type=float, help="Voltage across the plates in V (default: 500)")
+    parser.add_argument('--plate-distance', type=float, help="Plate separation in mm (default: 4.902)")
+    parser.add_argument('--store', default=os.path.join('output', 'results.sqlite'), help="SQLite results store the droplets are added to (default: output/results.sqlite)")
+    parser.add_argument('--no-store', action='store_true', help="Only write the CSV file, not the results store")
+    parser.add_argument('--cohort', default='', help="Label the droplets are stored under, e.g. a class or a session")
+    parser.add_argument('--workers', type=int, default=cpu_count(), help="Number of worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    if not args.rois and not args.auto_roi:
+        parser.error("Give the ROIs with --rois, or use --auto-roi to detect them")
+    rois = load_rois(args.rois) if args.rois else {}
+    videos = sorted(f for f in os.listdir(args.directory) if f.lower().endswith(VIDEO_EXTENSIONS))
+    if not videos:
+        parser.error(f"No video files were found in {args.directory}")
+
+    # Only the constants given on the command line; the rest keep the ChargeCalculator defaults
+    calibration = {name: value for name, value in (
+        ('pixels_mm', args.pixels_mm), ('fps', args.fps), ('roomtempc', args.temperature),
+        ('pressure_torr', args.pressure), ('voltage', args.voltage), ('distance_mm', args.plate_distance),
+    ) if value is not None}
+    # None for no proxy, else the color mode of the proxy
+    proxy = 'gray' if args.proxy_gray else 'bgr' if args.proxy else None
+    jobs = []
+    rows = []
+    for video in videos:
+        if video in rois or args.auto_roi:
+            jobs.append((os.path.join(args.directory, video), rois.get(video), args.tracker, args.crop,
+                         not args.no_cache, args.max_droplets, args.stride, args.max_stride, proxy, args.bootstrap,
+                         calibration))
+        else:
+            rows.append({'video': video, 'error': "No ROI given for this video"})
+
+    store = None if args.no_store else ResultsStore(args.store)
+    parameters = ChargeCalculator(**calibration).parameters()
+    estimator = ElementaryChargeEstimator()
+    charges = []  # Of this run, for the running estimate of e
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+        with Pool(processes=max(1, args.workers), initializer=init_worker) as pool:
+            for done, video_rows in enumerate(pool.imap_unordered(analyze_video, jobs), start=1):
+                writer.writerows(video_rows)
+                f.flush()
+                if store is not None:
+                    store.add_many(
+                        dict(video=os.path.join(args.directory, row['video']), roi=(row['x'], row['y'], row['w'], row['h']),
+                             vu=row['vu'], vd=row['vd'], charge=row['charge'], integer=row['integer'], tracker=row['tracker'], crop=row['crop'],
+                             droplet=row['droplet'], calibration=parameters, cohort=args.cohort,
+                             slope_up=row['slope_up'], slope_down=row['slope_down'])
+                        for row in video_rows if row.get('vu') is not None
+                    )
+                for row in video_rows:
+                    status = row['error'] or f"q/e = {row['integer']:.2f}"
+                    if not row['error'] and row.get('integer_low') is not None:
+                        status += f" (95% {row['integer_low']:.2f} to {row['integer_high']:.2f})"
+                    print(f"[{done}/{len(jobs)}] {row['video']} droplet {row['droplet']}: {status}")
+                    if row.get('charge') is not None:
+                        charges.append(row['charge'])
+                try:
+                    estimate = estimator.estimate(charges)
+                except ValueError:
+                    continue  # Fewer than two droplets with a positive charge so far
+                print(f"    e = {estimate['elementary_charge']:.4e} +/- {estimate['stderr']:.1e} C "
+                      f"from {estimate['count']} droplets")
+
+    print(f"Results written to {args.output}")
+    if store is not None:
+        summary = store.summary(args.cohort)
+        if summary['count']:
+            print(f"{store.path}: {summary['count']} droplets in cohort '{args.cohort}', "
+                  f"q/e {summary['mean']:.3f} +/- {summary['std']:.3f}")
+        if summary['elementary_charge'] is not None:
+            print(f"e = {summary['elementary_charge']:.4e} +/- {summary['stderr']:.1e} C from every stored droplet "
+                  f"of cohort '{args.cohort}' (RMS residual {summary['rms_residual']:.3f})")
+        store.close()
+
+if __name__ == "__main__":
+    main()
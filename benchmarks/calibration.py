@@ -0,0 +1,69 @@
+"""Time recomputing stored droplet charges under a grid of calibrations.
+
+Example (from the repository root):
+    python -m benchmarks.calibration --droplets 200 --temperatures 18 20 22 24 --pressures 740 760 780 \
+        --voltages 450 500 550 --calibrations 400 414.2 430
+
+The pixel slopes of --droplets droplets are drawn like those of real videos (rising 0.5 to
+3 and falling 0.2 to 1 pixels per frame), or read from a results store with --store, and
+ChargeCalculator.sweep() turns them into charges and q/e for every combination of the given
+temperatures, pressures, voltages and pixel calibrations. Reports the time of the sweep, the
+number of charges it computed and the time of the same grid computed one calculator at a time.
+"""
+import argparse
+import itertools
+import time
+import numpy as np
+from components import ChargeCalculator, ResultsStore
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark calibration sweeps over stored pixel slopes.")
+    parser.add_argument('--droplets', type=int, default=200, help="Number of synthetic droplets (default: 200)")
+    parser.add_argument('--store', help="Take the slopes from this results store instead")
+    parser.add_argument('--cohort', help="Cohort of the store to take (default: all)")
+    parser.add_argument('--temperatures', type=float, nargs='+', default=list(np.arange(15, 30.5, 1.0)))
+    parser.add_argument('--pressures', type=float, nargs='+', default=list(np.arange(720, 801, 10.0)))
+    parser.add_argument('--voltages', type=float, nargs='+', default=list(np.arange(400, 601, 25.0)))
+    parser.add_argument('--calibrations', type=float, nargs='+', default=list(np.arange(400, 431, 5.0)))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.store:
+        store = ResultsStore(args.store)
+        slope_up, slope_down = store.slopes(args.cohort)
+        store.close()
+        if len(slope_up) == 0:
+            parser.error(f"{args.store} holds no droplets with pixel slopes")
+    else:
+        rng = np.random.default_rng(args.seed)
+        slope_up = rng.uniform(0.5, 3.0, args.droplets)
+        slope_down = rng.uniform(0.2, 1.0, args.droplets)
+
+    calculator = ChargeCalculator()
+    grid = dict(roomtempc=args.temperatures, pressure_torr=args.pressures, voltage=args.voltages,
+                pixels_mm=args.calibrations)
+    started = time.perf_counter()
+    charges, integers = calculator.sweep(slope_up, slope_down, **grid)
+    seconds = time.perf_counter() - started
+    print(f"{len(slope_up)} droplets x {charges.size // len(slope_up)} calibrations = {charges.size} charges "
+          f"in {seconds * 1000:.1f} ms")
+
+    # The same grid one calculator per combination, as recalibrating without sweep() would do
+    combinations = list(itertools.product(*grid.values()))
+    sample = combinations[::max(1, len(combinations) // 200)]
+    started = time.perf_counter()
+    for values in sample:
+        single = ChargeCalculator(**dict(zip(grid, values)))
+        single.find_charges_and_integers(*single.velocities(slope_up, slope_down))
+    per_combination = (time.perf_counter() - started) / len(sample)
+    print(f"one calculator per calibration: {per_combination * len(combinations) * 1000:.1f} ms "
+          f"(estimated from {len(sample)} of {len(combinations)})")
+
+    # The sweep must agree with a calculator built for one of the combinations
+    index = tuple(len(values) // 2 for values in grid.values())
+    single = ChargeCalculator(**{name: values[i] for (name, values), i in zip(grid.items(), index)})
+    expected, _ = single.find_charges_and_integers(*single.velocities(slope_up, slope_down))
+    print(f"largest difference from a single calculator: {np.ma.max(np.abs(charges[index] - expected)):.2e} C")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Time the elementary-charge estimator on synthetic droplet charges.
+
+Example (from the repository root):
+    python -m benchmarks.charges --counts 100 10000 100000 --noise 0.1 0.2 0.3
+
+Charges are drawn as random multiples (1 to --max-multiple) of the elementary charge with
+Gaussian noise of the given width in units of e, the way tracking errors spread measured q/e.
+For each count and noise level this reports the time of one estimate, the relative error of
+the estimated e and the fraction of droplets given their true multiple.
+"""
+import argparse
+import time
+import numpy as np
+from components import ELEMENTARY_CHARGE, ElementaryChargeEstimator
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the elementary-charge estimator.")
+    parser.add_argument('--counts', type=int, nargs='+', default=[100, 10000, 100000], help="Numbers of droplets")
+    parser.add_argument('--noise', type=float, nargs='+', default=[0.1, 0.2, 0.3], help="Noise widths in units of e")
+    parser.add_argument('--max-multiple', type=int, default=20, help="Largest multiple of e drawn (default: 20)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    estimator = ElementaryChargeEstimator()
+    for count in args.counts:
+        for noise in args.noise:
+            multiples = rng.integers(1, args.max_multiple + 1, count)
+            charges = (multiples + rng.normal(0, noise, count)) * ELEMENTARY_CHARGE
+            started = time.perf_counter()
+            estimate = estimator.estimate(charges)
+            seconds = time.perf_counter() - started
+            error = estimate['elementary_charge'] / ELEMENTARY_CHARGE - 1
+            assigned = np.mean(estimate['integers'] == multiples)
+            print(f"{count:8d} charges  noise {noise:4.2f} e  {seconds * 1000:7.1f} ms  "
+                  f"e error {error:+.2e}  integers right {assigned:6.1%}")
+
+if __name__ == "__main__":
+    main()
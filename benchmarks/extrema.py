@@ -0,0 +1,99 @@
+"""Check the incremental ExtremumDetector against scipy's find_peaks on tracker-like trajectories.
+
+Example (from the repository root):
+    python -m benchmarks.extrema --trajectories 500 --frames 900 3000 10000
+
+Trajectories rise and fall like droplets in the field, pause at the turns and carry Gaussian
+tracking noise, and are then quantized the way integer tracker boxes quantize them: the
+y-center of a box with integer y and height moves in half pixels, so equal heights and flat
+plateaus are the rule rather than the exception. Every trajectory is fed to a peak and a
+trough detector one batch of frames at a time, as the application does, and after every
+batch the result is compared with find_peaks(y, distance=100, prominence=100) on the frames
+so far, run the way scipy runs it but keeping the leftmost of equal maxima within distance.
+Any difference there is a bug. Differences from plain find_peaks, which keeps whichever
+equal maximum numpy's unstable argsort happens to put last, are counted separately.
+
+The time per batch of both is reported for the first and the last quarter of the batches.
+The detector only looks at the last few hundred frames, so its time per batch does not grow
+with the length of the trajectory, where find_peaks over the frames so far takes longer with
+every batch.
+"""
+import argparse
+import time
+import numpy as np
+from components import ExtremumDetector
+
+def trajectory(rng, frames):
+    """A quantized y-center trajectory of a droplet moving up and down with pauses at the turns."""
+    y = []
+    position = rng.uniform(150, 350)
+    direction = rng.choice([-1, 1])
+    while len(y) < frames:
+        leg = int(rng.integers(60, 300))
+        speed = rng.uniform(0.3, 3.0)
+        y.extend(position + direction * speed * np.arange(1, leg + 1))
+        position = y[-1]
+        y.extend([position] * int(rng.integers(0, 20)))  # The droplet hangs while the field switches
+        direction = -direction
+    y = np.array(y[:frames]) + rng.normal(0, rng.uniform(0.2, 1.5), frames)
+    # Top edge and height of an integer box; the center moves in steps of half a pixel
+    height = int(rng.integers(10, 40))
+    return (np.round(y - height / 2) + height / 2).astype(np.float32)
+
+def leftmost_find_peaks(y, distance=100, prominence=100):
+    """find_peaks(y, distance=distance, prominence=prominence), keeping the leftmost of equal maxima."""
+    from scipy.signal import find_peaks, peak_prominences
+    maxima, _ = find_peaks(y)
+    keep = np.ones(len(maxima), dtype=bool)
+    for j in np.lexsort((maxima, -y[maxima])):
+        if keep[j]:
+            close = np.abs(maxima - maxima[j]) < distance
+            close[j] = False
+            keep[close] = False
+    maxima = maxima[keep]
+    if len(maxima) == 0:
+        return maxima
+    return maxima[peak_prominences(y, maxima)[0] >= prominence]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare ExtremumDetector with scipy's find_peaks.")
+    parser.add_argument('--trajectories', type=int, default=500, help="Trajectories per length (default: 500)")
+    parser.add_argument('--frames', type=int, nargs='+', default=[900, 3000], help="Trajectory lengths in frames")
+    parser.add_argument('--batch', type=int, default=50, help="Frames per update (default: 50)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from scipy.signal import find_peaks
+    rng = np.random.default_rng(args.seed)
+    for frames in args.frames:
+        wrong = tie_order = 0
+        ends = range(args.batch, frames + args.batch, args.batch)
+        batch_seconds = np.zeros((2, len(ends)))  # Detector, find_peaks
+        for _ in range(args.trajectories):
+            y = trajectory(rng, frames)
+            detectors = ExtremumDetector(), ExtremumDetector()
+            mismatch = differs = False
+            for position, end in enumerate(ends):
+                prefix = y[:end].astype(float)
+                for detector, signal in zip(detectors, (prefix, -prefix)):
+                    started = time.perf_counter()
+                    found = detector.update(signal)
+                    batch_seconds[0, position] += time.perf_counter() - started
+                    started = time.perf_counter()
+                    expected, _ = find_peaks(signal, distance=100, prominence=100)
+                    batch_seconds[1, position] += time.perf_counter() - started
+                    mismatch = mismatch or not np.array_equal(found, leftmost_find_peaks(signal))
+                    differs = differs or not np.array_equal(found, expected)
+            wrong += mismatch
+            tie_order += differs
+        quarter = max(1, len(ends) // 4)
+        first = batch_seconds[:, :quarter].mean(axis=1) / args.trajectories * 1e3
+        last = batch_seconds[:, -quarter:].mean(axis=1) / args.trajectories * 1e3
+        print(f"{frames:6d} frames: {wrong}/{args.trajectories} trajectories wrong, "
+              f"{tie_order} differ from find_peaks in the order of equal maxima")
+        for row, name in enumerate(('incremental', 'find_peaks')):
+            print(f"{'':14}{name:11s} {batch_seconds[row].sum() * 1000:8.1f} ms  "
+                  f"{first[row]:.3f} ms/batch in the first quarter, {last[row]:.3f} in the last")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Time every stage of the tracking pipeline on synthetic videos and check the results.
+
+Example (from the repository root):
+    python -m benchmarks.pipeline --output pipeline_benchmark.json
+    python -m benchmarks.pipeline --videos synthetic_data --baseline pipeline_benchmark.json
+
+Without --videos a small set of synthetic videos is rendered to a temporary directory
+first. Each video is processed the way the application plays it: decode, resize,
+tracker.update and display conversion per frame, and every 50 frames the chart update
+(peak/trough detection and redrawing the trajectory) and the velocity and charge
+analysis. Per-stage timings, the recovered velocities and q/e, and whether they match the
+ground truth within tolerance are written as JSON, so runs can be compared with --baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import cv2
+import numpy as np
+from PIL import Image
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from util import add_end_points, find_slopes
+from components import BlitManager, ChargeCalculator, DEFAULT_TRACKER, ExtremumDetector, TRACKERS, Trajectory, create_tracker
+from benchmarks.synthetic import generate, load_ground_truth
+
+STAGES = ['decode', 'resize', 'tracker_update', 'display_frame', 'update_chart', 'analysis']
+DEFAULT_VIDEOS = [
+    {'width': 640, 'height': 480, 'noise': 4.0, 'blur': 0.0},
+    {'width': 1280, 'height': 720, 'noise': 6.0, 'blur': 1.0},
+]
+
+class DisplayConverter:
+    """The conversions display_frame does, with the Tk PhotoImage paste when a display is available.
+
+    Like the application, every frame is converted into one reused RGBA buffer that a PIL
+    image maps without copying, and pasted into one persistent photo.
+    """
+
+    def __init__(self):
+        try:
+            import tkinter as tk
+            from PIL import ImageTk
+            self.root = tk.Tk()
+            self.root.withdraw()
+            self.photo_image_type = ImageTk.PhotoImage
+        except Exception:
+            self.root = None
+        self.rgba_buffer = self.rgba_image = self.photo_image = None
+
+    def __call__(self, frame):
+        height, width = frame.shape[:2]
+        if self.rgba_buffer is None or self.rgba_buffer.shape[:2] != (height, width):
+            self.rgba_buffer = np.empty((height, width, 4), dtype=np.uint8)
+            self.rgba_image = Image.frombuffer('RGBA', (width, height), self.rgba_buffer, 'raw', 'RGBA', 0, 1)
+            self.photo_image = None
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=self.rgba_buffer)
+        if self.root is None:
+            return
+        if self.photo_image is None:
+            self.photo_image = self.photo_image_type(image=self.rgba_image)
+        else:
+            self.photo_image.paste(self.rgba_image)
+
+class ChartModel:
+    """Off-screen copy of the trajectory chart of the application, updated the same way."""
+
+    def __init__(self, total_frames):
+        figure = Figure(figsize=(5, 4), dpi=100)
+        self.canvas = FigureCanvasAgg(figure)
+        ax = figure.add_subplot(111)
+        ax.set_xlim(0, total_frames)
+        ax.set_ylim(0, 512)
+        self.trajectory_line, = ax.plot([], [], label='Y-Center Trajectory')
+        self.peak_markers, = ax.plot([], [], 'ro', label='Peaks')
+        self.trough_markers, = ax.plot([], [], 'go', label='Troughs')
+        self.blitter = BlitManager(self.canvas, [self.trajectory_line, self.peak_markers, self.trough_markers])
+        self.canvas.draw()
+        self.peak_detector = ExtremumDetector(distance=100, prominence=100)
+        self.trough_detector = ExtremumDetector(distance=100, prominence=100)
+
+    def update(self, t, y):
+        peaks = self.peak_detector.update(y)
+        troughs = self.trough_detector.update(-y)
+        peaks, troughs = add_end_points(peaks, troughs, len(y))
+        self.trajectory_line.set_data(t, y)
+        self.peak_markers.set_data(t[peaks], y[peaks])
+        self.trough_markers.set_data(t[troughs], y[troughs])
+        self.blitter.update()
+        return peaks, troughs
+
+def analyze(charge_calculator, t, y, peaks, troughs):
+    peak_points = [(int(t[index]), float(y[index])) for index in peaks]
+    trough_points = [(int(t[index]), float(y[index])) for index in troughs]
+    vu, vd = find_slopes(peak_points, trough_points)
+    charge, integer = charge_calculator.find_charge_and_integer(vu, vd)
+    return vu, vd, integer
+
+def run_video(video_path, bbox, tracker_name, display, display_size=(512, 512), batch_size=50):
+    """Play one video through every stage; returns (timings per stage in seconds, (vu, vd, q/e) or None)."""
+    timings = {stage: [] for stage in STAGES}
+    clock = time.perf_counter
+
+    video = cv2.VideoCapture(video_path)
+    total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    ret, frame = video.read()
+    if not ret:
+        raise ValueError(f"Could not read the first frame of {video_path}")
+    tracker = create_tracker(tracker_name)
+    tracker.init(cv2.resize(frame, display_size), tuple(int(v) for v in bbox))
+
+    trajectory = Trajectory(max(total_frames, 1))
+    chart = ChartModel(total_frames)
+    charge_calculator = ChargeCalculator()
+    result = None
+
+    def process_batch(end):
+        t, y = trajectory.y_centers(1, end)
+        if len(y) == 0:
+            return None
+        start = clock()
+        peaks, troughs = chart.update(t, y)
+        timings['update_chart'].append(clock() - start)
+
+        start = clock()
+        try:
+            return analyze(charge_calculator, t, y, peaks, troughs)
+        except ValueError:
+            return None
+        finally:
+            timings['analysis'].append(clock() - start)
+
+    analyzed_end = 1
+    index = 0
+    while True:
+        start = clock()
+        ret, frame = video.read()
+        timings['decode'].append(clock() - start)
+        if not ret:
+            break
+        index += 1
+
+        start = clock()
+        frame = cv2.resize(frame, display_size)
+        timings['resize'].append(clock() - start)
+
+        start = clock()
+        ok, tracked_bbox = tracker.update(frame)
+        timings['tracker_update'].append(clock() - start)
+        if ok:
+            trajectory.record(index, tracked_bbox)
+
+        start = clock()
+        display(frame)
+        timings['display_frame'].append(clock() - start)
+
+        if index + 1 - analyzed_end >= batch_size:
+            analyzed_end = index + 1
+            result = process_batch(analyzed_end) or result
+
+    # The result is checked on the whole trajectory; the last live batch can end mid-leg,
+    # before the final turning point is confirmed
+    if analyzed_end < index + 1:
+        result = process_batch(index + 1) or result
+    video.release()
+    return timings, result
+
+def summarize(samples):
+    if not samples:
+        return {'calls': 0}
+    samples = np.asarray(samples) * 1e3
+    return {
+        'calls': len(samples),
+        'total_s': round(float(samples.sum()) / 1e3, 4),
+        'mean_ms': round(float(samples.mean()), 4),
+        'p50_ms': round(float(np.percentile(samples, 50)), 4),
+        'p95_ms': round(float(np.percentile(samples, 95)), 4),
+        'max_ms': round(float(samples.max()), 4),
+    }
+
+def check(result, truth, velocity_tolerance, integer_tolerance):
+    """Compare the recovered (vu, vd, q/e) with the ground truth."""
+    if result is None:
+        return {'vu': None, 'vd': None, 'integer': None, 'passed': False}
+    vu, vd, integer = result
+    vu_error = abs(vu - truth['vu']) / truth['vu']
+    vd_error = abs(vd - truth['vd']) / truth['vd']
+    integer_error = abs(integer - truth['integer'])
+    return {
+        'vu': vu, 'vd': vd, 'integer': integer,
+        'true_vu': truth['vu'], 'true_vd': truth['vd'], 'true_integer': truth['integer'],
+        'vu_relative_error': vu_error,
+        'vd_relative_error': vd_error,
+        'integer_error': integer_error,
+        'passed': bool(vu_error <= velocity_tolerance and vd_error <= velocity_tolerance and integer_error <= integer_tolerance),
+    }
+
+def compare_to_baseline(report, baseline):
+    """Print the ratio of each stage's median time to the baseline run's."""
+    previous = {(video['video'], stage): stats for video in baseline['videos'] for stage, stats in video['stages'].items()}
+    for video in report['videos']:
+        for stage, stats in video['stages'].items():
+            before = previous.get((video['video'], stage))
+            if not before or not before.get('p50_ms') or not stats.get('p50_ms'):
+                continue
+            ratio = stats['p50_ms'] / before['p50_ms']
+            print(f"{video['video']:<22} {stage:<15} {before['p50_ms']:9.3f} -> {stats['p50_ms']:9.3f} ms  x{ratio:.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on synthetic videos and check against ground truth.")
+    parser.add_argument('--videos', help="Directory written by benchmarks.synthetic (default: render a fresh set)")
+    parser.add_argument('--frames', type=int, default=900, help="Frames per rendered video (default: 900)")
+    parser.add_argument('--tracker', default=DEFAULT_TRACKER, type=str.upper, choices=list(TRACKERS))
+    parser.add_argument('--velocity-tolerance', type=float, default=0.05, help="Allowed relative velocity error (default: 0.05)")
+    parser.add_argument('--integer-tolerance', type=float, default=0.25, help="Allowed absolute q/e error (default: 0.25)")
+    parser.add_argument('--output', default='pipeline_benchmark.json', help="JSON file for the results")
+    parser.add_argument('--baseline', help="Earlier JSON results to compare the stage timings with")
+    args = parser.parse_args(argv)
+
+    if args.videos:
+        directory = args.videos
+    else:
+        directory = tempfile.mkdtemp(prefix='millikan_synthetic_')
+        print(f"Rendering synthetic videos to {directory}")
+        for number, options in enumerate(DEFAULT_VIDEOS):
+            generate(os.path.join(directory, f"{options['width']}x{options['height']}"), count=1,
+                     integers=[3 + 2 * number], seed=number, frames=args.frames, **options)
+    truths = {}
+    for root, _, files in os.walk(directory):
+        if 'ground_truth.json' in files:
+            truths.update({os.path.join(root, name): truth for name, truth in load_ground_truth(root).items()})
+    if not truths:
+        parser.error(f"No ground_truth.json was found in {directory}")
+
+    display = DisplayConverter()
+    report = {
+        'tracker': args.tracker,
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'display_includes_photoimage': display.root is not None,
+        'videos': [],
+    }
+    for video_path, truth in sorted(truths.items()):
+        start = time.perf_counter()
+        timings, result = run_video(video_path, truth['roi'], args.tracker, display)
+        elapsed = time.perf_counter() - start
+        frames = len(timings['decode']) - 1
+        accuracy = check(result, truth, args.velocity_tolerance, args.integer_tolerance)
+        report['videos'].append({
+            'video': os.path.relpath(video_path, directory),
+            'width': truth['width'], 'height': truth['height'],
+            'noise': truth['noise'], 'blur': truth['blur'],
+            'frames': frames,
+            'fps': frames / elapsed if elapsed else None,
+            'stages': {stage: summarize(samples) for stage, samples in timings.items()},
+            'accuracy': accuracy,
+        })
+
+        status = 'ok' if accuracy['passed'] else 'MISMATCH'
+        integer = f"{accuracy['integer']:.2f}" if accuracy['integer'] is not None else '-'
+        print(f"{os.path.relpath(video_path, directory)}: {frames / elapsed:.1f} fps  "
+              f"q/e {integer} (true {truth['integer']:.2f})  {status}")
+        for stage in STAGES:
+            stats = report['videos'][-1]['stages'][stage]
+            if stats['calls']:
+                print(f"    {stage:<15} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms  x{stats['calls']}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare_to_baseline(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Check and time seeks through the keyframe index against decoding every frame in order.
+
+Example (from the repository root):
+    python -m benchmarks.seeking sample_data --seeks 100
+
+For every video this decodes all frames in order, then seeks to --seeks random frames with
+a fresh FrameCache, once with the FrameIndex and once with plain CAP_PROP_POS_FRAMES
+seeking, and reports how many of the frames returned differ from the frame decoded in order
+and the mean time of a seek. Videos with B-frames (most H.264 from cameras and phones) are
+where numbering the frames in decode order instead of presentation order shows up here.
+"""
+import argparse
+import os
+import time
+import cv2
+import numpy as np
+from batch import VIDEO_EXTENSIONS
+from components import FrameCache, FrameIndex
+
+SIZE = (128, 128)  # Frames are compared at this size to keep the reference decode small
+
+def check(video_path, targets, frame_index, reference):
+    """Return (frames that differ from the reference, mean seconds per seek)."""
+    wrong = 0
+    started = time.perf_counter()
+    for target in targets:
+        cache = FrameCache(cv2.VideoCapture(video_path), SIZE, read_ahead=0, read_behind=0, frame_index=frame_index)
+        frame = cache.get(int(target))
+        wrong += frame is None or not np.array_equal(frame, reference[target])
+    return wrong, (time.perf_counter() - started) / len(targets)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check keyframe-index seeks against sequential decoding.")
+    parser.add_argument('directory', help="Directory containing the videos")
+    parser.add_argument('--seeks', type=int, default=100, help="Random frames to seek to per video (default: 100)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    for video in sorted(f for f in os.listdir(args.directory) if f.lower().endswith(VIDEO_EXTENSIONS)):
+        video_path = os.path.join(args.directory, video)
+        capture = cv2.VideoCapture(video_path)
+        reference = []
+        while True:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            reference.append(cv2.resize(frame, SIZE))
+        capture.release()
+        if not reference:
+            print(f"{video}: no frames could be decoded")
+            continue
+
+        frame_index = FrameIndex.build(video_path)
+        targets = rng.integers(0, len(reference), args.seeks)
+        indexed_wrong, indexed_seconds = check(video_path, targets, frame_index, reference)
+        plain_wrong, plain_seconds = check(video_path, targets, None, reference)
+        print(f"{video}: {len(reference)} frames, {len(frame_index.keyframes)} keyframes  "
+              f"index {indexed_wrong}/{args.seeks} wrong {indexed_seconds * 1000:6.1f} ms/seek  "
+              f"POS_FRAMES {plain_wrong}/{args.seeks} wrong {plain_seconds * 1000:6.1f} ms/seek")
+
+if __name__ == "__main__":
+    main()
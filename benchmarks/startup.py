@@ -0,0 +1,78 @@
+"""Measure how long the application takes to start.
+
+Example (from the repository root):
+    python -m benchmarks.startup --runs 5 --output startup_benchmark.json
+
+Each run starts a fresh interpreter, imports main, builds MillikanExperimentApp and
+processes the pending Tk events so the first window is drawn. Reported per run: the wall
+time from launch until the window is up, the import time of main, the time to build the
+window, and whether scipy.signal was loaded on the way. Without a display only the import
+is measured. --cold empties media/cache before every run to
+time the first start, which renders the instruction-page bitmaps.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import numpy as np
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import tkinter as tk
+import main
+imported = time.perf_counter()
+result = {'import_s': imported - start}
+try:
+    root = tk.Tk()
+except tk.TclError:
+    root = None
+if root is not None:
+    app = main.MillikanExperimentApp(root)
+    root.update()
+    result['window_s'] = time.perf_counter() - imported
+    root.destroy()
+result['scipy_loaded'] = 'scipy.signal' in sys.modules
+print(json.dumps(result))
+"""
+
+def run_once(cold):
+    if cold:
+        shutil.rmtree(os.path.join('media', 'cache'), ignore_errors=True)
+    launched = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD], capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['total_s'] = time.perf_counter() - launched
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the start of the application in fresh interpreters.")
+    parser.add_argument('--runs', type=int, default=5, help="Number of starts to time (default: 5)")
+    parser.add_argument('--cold', action='store_true', help="Clear media/cache before each run")
+    parser.add_argument('--output', help="Optional JSON file for the results")
+    args = parser.parse_args(argv)
+
+    # One untimed start fills the OS file cache (and media/cache unless --cold)
+    run_once(args.cold)
+    runs = [run_once(args.cold) for _ in range(args.runs)]
+
+    summary = {}
+    for key in ('total_s', 'import_s', 'window_s'):
+        values = [run[key] for run in runs if key in run]
+        if values:
+            summary[key] = float(np.median(values))
+            print(f"{key:<9} median {summary[key] * 1e3:8.1f} ms  (min {min(values) * 1e3:.1f}, max {max(values) * 1e3:.1f})")
+    if 'window_s' not in summary:
+        print("No display available: only the import was timed")
+    print(f"scipy.signal loaded at startup: {runs[-1]['scipy_loaded']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'cold': args.cold, 'median': summary, 'runs': runs}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
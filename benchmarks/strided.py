@@ -0,0 +1,84 @@
+"""Compare strided and adaptive-stride tracking with tracking every frame.
+
+Example (from the repository root):
+    python -m benchmarks.strided sample_data --rois rois.csv --strides 2 4 8 --adaptive 4:16
+
+For every video this tracks the first droplet at full rate and at each stride (a plain k,
+or base:max for the adaptive stride) without the track cache, and reports the tracked
+frames, the wall time, the speed-up over full rate and the q/e difference from it.
+"""
+import argparse
+import csv
+import os
+import time
+from batch import VIDEO_EXTENSIONS, load_rois
+from components import DEFAULT_TRACKER, TRACKERS, VideoAnalyzer
+
+RESULT_FIELDS = ['video', 'stride', 'max_stride', 'frames_tracked', 'seconds', 'speedup', 'vu', 'vd', 'integer', 'integer_error']
+
+def run(video_path, bbox, tracker_name, stride=1, max_stride=None):
+    """Track and analyze one droplet; returns (tracked frames, seconds, vu, vd, integer)."""
+    analyzer = VideoAnalyzer(tracker_name=tracker_name, use_cache=False, stride=stride, max_stride=max_stride)
+    started = time.perf_counter()
+    frames, bboxes = analyzer.track(video_path, bbox)
+    seconds = time.perf_counter() - started
+    try:
+        vu, vd = analyzer.find_velocities(bboxes[:, 1] + bboxes[:, 3] / 2, frames)
+        integer = analyzer.charge_calculator.find_charge_and_integer(vu, vd)[1]
+    except ValueError:
+        vu = vd = integer = None
+    return len(frames), seconds, vu, vd, integer
+
+def parse_stride(text):
+    """'4' is a fixed stride, '4:16' an adaptive one between 4 and 16."""
+    stride, _, max_stride = text.partition(':')
+    return int(stride), int(max_stride or stride)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark strided tracking against tracking every frame.")
+    parser.add_argument('directory', help="Directory containing the experiment videos")
+    parser.add_argument('--rois', required=True, help="CSV file with columns video,x,y,w,h")
+    parser.add_argument('--tracker', default=DEFAULT_TRACKER, type=str.upper, choices=list(TRACKERS))
+    parser.add_argument('--strides', nargs='+', default=['2', '4', '8'], help="Fixed strides to compare (default: 2 4 8)")
+    parser.add_argument('--adaptive', nargs='*', default=['2:8'], help="Adaptive strides as base:max (default: 2:8)")
+    parser.add_argument('--output', help="Optional CSV file for the results")
+    args = parser.parse_args(argv)
+
+    rois = load_rois(args.rois)
+    videos = sorted(f for f in os.listdir(args.directory) if f.lower().endswith(VIDEO_EXTENSIONS) and f in rois)
+    settings = [(1, 1)] + [parse_stride(text) for text in args.strides + args.adaptive]
+
+    rows = []
+    for video in videos:
+        video_path = os.path.join(args.directory, video)
+        reference_seconds = reference_integer = None
+        for stride, max_stride in settings:
+            frames_tracked, seconds, vu, vd, integer = run(video_path, rois[video][0], args.tracker, stride, max_stride)
+            if stride == max_stride == 1:
+                reference_seconds, reference_integer = seconds, integer
+            error = None if integer is None or reference_integer is None else abs(integer - reference_integer)
+            rows.append({
+                'video': video,
+                'stride': stride,
+                'max_stride': max_stride,
+                'frames_tracked': frames_tracked,
+                'seconds': seconds,
+                'speedup': reference_seconds / seconds,
+                'vu': vu, 'vd': vd,
+                'integer': integer,
+                'integer_error': error,
+            })
+            label = f"{stride}" if stride == max_stride else f"{stride}:{max_stride}"
+            print(f"{video:<30} stride {label:<6} {frames_tracked:6d} frames {seconds:7.2f} s  "
+                  f"x{reference_seconds / seconds:5.2f}  q/e {'-' if integer is None else f'{integer:6.3f}'}  "
+                  f"error {'-' if error is None else f'{error:.3f}'}")
+
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
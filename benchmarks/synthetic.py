@@ -0,0 +1,149 @@
+"""Render synthetic oil-drop videos with known velocities and charge.
+
+Example (from the repository root):
+    python -m benchmarks.synthetic synthetic_data --count 4 --width 1280 --height 720
+
+Each video shows one droplet falling and rising between two heights at constant
+velocities, plus sensor noise and optional blur. The directory also gets rois.csv in the
+format batch.py and the benchmarks read, and ground_truth.json with the velocities, the
+q/e they give and the exact y-center of every frame in display coordinates.
+"""
+import argparse
+import csv
+import json
+import os
+import cv2
+import numpy as np
+from components import ChargeCalculator
+
+FPS = 30  # util.find_slopes assumes 30 fps
+DISPLAY_SIZE = (512, 512)
+SUBPIXEL_BITS = 4
+
+def rise_velocity_for(integer, vd, calculator=None):
+    """Upward velocity in m/s that makes a droplet falling at vd carry integer elementary charges."""
+    calculator = calculator or ChargeCalculator()
+    # The charge is linear in vu for a given vd
+    _, integers = calculator.find_charges_and_integers([1.0, 2.0], vd)
+    slope = integers[1] - integers[0]
+    vu = (integer - (integers[0] - slope)) / slope
+    if vu <= 0:
+        raise ValueError(f"A droplet falling at {vd} m/s cannot rise with {integer} elementary charges")
+    return vu
+
+def display_pixels_per_frame(velocity, calculator=None):
+    """Convert a velocity in m/s to display pixels per frame with the calibration of the analysis."""
+    calculator = calculator or ChargeCalculator()
+    return velocity * 1e3 * calculator.pixels_mm / FPS
+
+def droplet_path(frames, vu, vd, top, bottom):
+    """y-center per frame in display pixels: fall from top to bottom at vd, rise back at vu, repeat."""
+    fall = display_pixels_per_frame(vd)
+    rise = display_pixels_per_frame(vu)
+    y = np.empty(frames)
+    position, falling = top, True
+    for index in range(frames):
+        y[index] = position
+        if falling:
+            position += fall
+            if position >= bottom:
+                position, falling = bottom - (position - bottom), False
+        else:
+            position -= rise
+            if position <= top:
+                position, falling = top + (top - position), True
+    return y
+
+def render_video(path, vu, vd, width=640, height=480, frames=900, droplet_radius=6.0, noise=4.0, blur=0.0,
+                 top=80.0, bottom=420.0, x=None, seed=0):
+    """Write one synthetic video and return its ground truth; top, bottom and x are display pixels."""
+    cv2.setRNGSeed(seed)
+    scale_x = width / DISPLAY_SIZE[0]
+    scale_y = height / DISPLAY_SIZE[1]
+    x = DISPLAY_SIZE[0] / 2 if x is None else x
+    y = droplet_path(frames, vu, vd, top, bottom)
+
+    # Static background with a faint vertical gradient, like the illumination of the chamber
+    background = np.linspace(18, 30, height, dtype=np.float32)[:, None, None] * np.ones((1, width, 3), np.float32)
+    radius = max(1, int(round(droplet_radius * scale_y * (1 << SUBPIXEL_BITS))))
+    center_x = int(round(x * scale_x * (1 << SUBPIXEL_BITS)))
+
+    noise_frame = np.empty_like(background)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), FPS, (width, height))
+    if not writer.isOpened():
+        raise ValueError(f"Could not open {path} for writing")
+    try:
+        for index in range(frames):
+            frame = background.copy()
+            center = (center_x, int(round(y[index] * scale_y * (1 << SUBPIXEL_BITS))))
+            cv2.circle(frame, center, radius, (235, 235, 235), -1, cv2.LINE_AA, SUBPIXEL_BITS)
+            if blur > 0:
+                frame = cv2.GaussianBlur(frame, (0, 0), blur * scale_y)
+            if noise > 0:
+                # cv2.randn is several times faster than numpy's normal generator at these sizes
+                frame += cv2.randn(noise_frame, 0, noise)
+            writer.write(np.clip(frame, 0, 255).astype(np.uint8))
+    finally:
+        writer.release()
+
+    charge, integer = ChargeCalculator().find_charge_and_integer(vu, vd)
+    size = 2 * droplet_radius + 6
+    return {
+        'video': os.path.basename(path),
+        'width': width, 'height': height, 'frames': frames,
+        'noise': noise, 'blur': blur,
+        'vu': vu, 'vd': vd,
+        'charge': charge, 'integer': integer,
+        'roi': [int(round(x - size / 2)), int(round(y[0] - size / 2)), int(round(size)), int(round(size))],
+        'y_centers': y.tolist(),
+    }
+
+def generate(directory, count=3, integers=(3, 5, 8), vd=1.0e-4, seed=0, **render_options):
+    """Render count videos into directory with rois.csv and ground_truth.json; returns the ground truth list."""
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    truths = []
+    for number in range(count):
+        integer = integers[number % len(integers)]
+        fall = vd * rng.uniform(0.8, 1.2)
+        truth = render_video(
+            os.path.join(directory, f"synthetic_{number:02d}.mp4"),
+            rise_velocity_for(integer, fall), fall, seed=seed + number, **render_options,
+        )
+        truths.append(truth)
+
+    with open(os.path.join(directory, 'rois.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['video', 'x', 'y', 'w', 'h'])
+        for truth in truths:
+            writer.writerow([truth['video']] + truth['roi'])
+    with open(os.path.join(directory, 'ground_truth.json'), 'w') as f:
+        json.dump(truths, f)
+    return truths
+
+def load_ground_truth(directory):
+    """Ground truth written by generate(), as a dict of video name -> record."""
+    with open(os.path.join(directory, 'ground_truth.json')) as f:
+        return {truth['video']: truth for truth in json.load(f)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render synthetic Millikan videos with known velocities.")
+    parser.add_argument('directory', help="Directory to write the videos, rois.csv and ground_truth.json to")
+    parser.add_argument('--count', type=int, default=3, help="Number of videos (default: 3)")
+    parser.add_argument('--integers', type=int, nargs='+', default=[3, 5, 8], help="Elementary charges to cycle through")
+    parser.add_argument('--vd', type=float, default=1.0e-4, help="Typical falling velocity in m/s (default: 1e-4)")
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--frames', type=int, default=900)
+    parser.add_argument('--noise', type=float, default=4.0, help="Standard deviation of the sensor noise in gray levels")
+    parser.add_argument('--blur', type=float, default=0.0, help="Gaussian blur sigma in display pixels")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    truths = generate(args.directory, args.count, args.integers, args.vd, args.seed, width=args.width,
+                      height=args.height, frames=args.frames, noise=args.noise, blur=args.blur)
+    for truth in truths:
+        print(f"{truth['video']}: vu={truth['vu']:.3e} m/s  vd={truth['vd']:.3e} m/s  q/e={truth['integer']:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compare tracker backends on the same videos for speed and agreement with CSRT.
+
+Example (from the repository root):
+    python -m benchmarks.trackers sample_data --rois rois.csv --output tracker_benchmark.csv
+
+For every video and tracker this reports tracker.update() frames/sec, the mean and
+maximum y-center deviation from CSRT on frames both trackers followed, and whether the
+rounded q/e matches the CSRT result.
+"""
+import argparse
+import csv
+import os
+import time
+import cv2
+import numpy as np
+from batch import VIDEO_EXTENSIONS, load_rois
+from components import TRACKERS, VideoAnalyzer, create_tracker
+
+REFERENCE_TRACKER = 'CSRT'
+RESULT_FIELDS = ['video', 'tracker', 'fps', 'frames_tracked', 'mean_deviation_px', 'max_deviation_px', 'integer', 'same_rounding']
+
+def run_tracker(video_path, bbox, tracker_name, display_size=(512, 512)):
+    """Track one video; returns (frame indices, y-centers, tracker.update calls per second)."""
+    video = cv2.VideoCapture(video_path)
+    ret, frame = video.read()
+    if not ret:
+        raise ValueError(f"Could not read the first frame of {video_path}")
+    tracker = create_tracker(tracker_name)
+    tracker.init(cv2.resize(frame, display_size), tuple(int(v) for v in bbox))
+
+    frames = []
+    y_centers = []
+    update_seconds = 0.0
+    index = 0
+    while True:
+        ret, frame = video.read()
+        if not ret:
+            break
+        index += 1
+        frame = cv2.resize(frame, display_size)
+        start = time.perf_counter()
+        ret, tracked_bbox = tracker.update(frame)
+        update_seconds += time.perf_counter() - start
+        if ret:
+            frames.append(index)
+            y_centers.append(tracked_bbox[1] + tracked_bbox[3] / 2)
+    video.release()
+    fps = index / update_seconds if update_seconds else None
+    return np.array(frames, dtype=int), np.array(y_centers, dtype=float), fps
+
+def compare(reference, candidate):
+    """Mean and max absolute y-center difference on the frames both trackers followed."""
+    _, reference_positions, candidate_positions = np.intersect1d(reference[0], candidate[0], return_indices=True)
+    if len(reference_positions) == 0:
+        return None, None
+    deviation = np.abs(reference[1][reference_positions] - candidate[1][candidate_positions])
+    return deviation.mean(), deviation.max()
+
+def integer_for(analyzer, frames, y_centers):
+    try:
+        vu, vd = analyzer.find_velocities(y_centers, frames)
+        return analyzer.charge_calculator.find_charge_and_integer(vu, vd)[1]
+    except ValueError:
+        return None
+
+def format_value(value, spec):
+    return format(value, spec) if value is not None else '-'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tracker backends against CSRT.")
+    parser.add_argument('directory', help="Directory containing the experiment videos")
+    parser.add_argument('--rois', required=True, help="CSV file with columns video,x,y,w,h")
+    parser.add_argument('--trackers', nargs='+', default=list(TRACKERS), type=str.upper, choices=list(TRACKERS))
+    parser.add_argument('--output', help="Optional CSV file for the results")
+    args = parser.parse_args(argv)
+
+    rois = load_rois(args.rois)
+    videos = sorted(f for f in os.listdir(args.directory) if f.lower().endswith(VIDEO_EXTENSIONS) and f in rois)
+    trackers = [REFERENCE_TRACKER] + [name for name in args.trackers if name != REFERENCE_TRACKER]
+    analyzer = VideoAnalyzer()
+
+    rows = []
+    for video in videos:
+        video_path = os.path.join(args.directory, video)
+        reference = None
+        reference_integer = None
+        for name in trackers:
+            # Only the first droplet of each video is compared
+            frames, y_centers, fps = run_tracker(video_path, rois[video][0], name)
+            integer = integer_for(analyzer, frames, y_centers) if len(y_centers) else None
+            if name == REFERENCE_TRACKER:
+                reference, reference_integer = (frames, y_centers), integer
+            mean_deviation, max_deviation = compare(reference, (frames, y_centers))
+            rows.append({
+                'video': video,
+                'tracker': name,
+                'fps': fps,
+                'frames_tracked': len(frames),
+                'mean_deviation_px': mean_deviation,
+                'max_deviation_px': max_deviation,
+                'integer': integer,
+                'same_rounding': None if integer is None or reference_integer is None else round(integer) == round(reference_integer),
+            })
+            print(f"{video:<30} {name:<9} {format_value(fps, '8.1f')} fps  "
+                  f"deviation {format_value(mean_deviation, '6.2f')} px  q/e {format_value(integer, '6.2f')}")
+
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+class BlitManager:
+    """Redraw only a figure's changing artists on top of a cached Agg background.
+
+    The artists are marked animated so full draws leave them out; every full draw caches
+    the background of `bbox` and paints the artists on top of it. update() then restores
+    that background and redraws just the artists, which takes a few milliseconds instead
+    of a full figure draw.
+    """
+
+    def __init__(self, canvas, artists, bbox=None):
+        self.canvas = canvas
+        self.bbox = bbox if bbox is not None else canvas.figure.bbox
+        self.artists = []
+        self.background = None
+        for artist in artists:
+            self.add_artist(artist)
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def add_artist(self, artist):
+        artist.set_animated(True)
+        self.artists.append(artist)
+
+    def remove_artist(self, artist):
+        self.artists.remove(artist)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in self.artists:
+            self.canvas.figure.draw_artist(artist)
+
+    def redraw(self):
+        """Full redraw, needed whenever something outside the artists (limits, ticks, size) changed."""
+        self.canvas.draw()
+
+    def update(self):
+        if self.background is None:
+            self.redraw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.bbox)
@@ -1,17 +1,43 @@
 import numpy as np
 
+ELEMENTARY_CHARGE = 1.602176634e-19  # Coulombs
+
+def charges_for(vu, vd, pressure_torr, distance_mm, voltage, roomtempc, density_oil, a_gravity=9.81):
+    """Charges in Coulombs for velocities in m/s; every argument may be an array and they are broadcast together."""
+    eta_0 = 1.8228e-5 + ((4.790e-8) * (roomtempc - 21))
+    radius_uncorrected = np.sqrt((9 * eta_0 * vd) / (2 * density_oil * a_gravity))
+    viscosity_air = eta_0 / (1 + (5.908e-5 / (radius_uncorrected * pressure_torr)))
+    radius = np.sqrt((9 * viscosity_air * vd) / (2 * density_oil * a_gravity))
+    mass = density_oil * 4 * np.pi * np.power(radius, 3) / 3
+    E = voltage / (distance_mm * 1e-3)
+    return ((mass * a_gravity) + (6 * np.pi * viscosity_air * radius * vu)) / E
+
 class ChargeCalculator:
-    def __init__(self):
-        self.pixels_mm = 414.20  # Calibration factor (pixels to mm)
-        self.pressure_torr = 760  # Atmospheric pressure in Torr
-        self.distance_mm = 4.902  # Plate distance in mm
+    def __init__(self, pixels_mm=414.20, fps=30, pressure_torr=760, distance_mm=4.902, voltage=500, roomtempc=20,
+                 density_oil=0.861e3):
+        self.pixels_mm = pixels_mm  # Calibration factor (pixels to mm)
+        self.fps = fps  # Frame rate the videos were recorded at
+        self.pressure_torr = pressure_torr  # Atmospheric pressure in Torr
+        self.distance_mm = distance_mm  # Plate distance in mm
         self.distance_m = self.distance_mm * 1e-3  # Convert mm to meters
-        self.voltage = 500  # Applied voltage in volts
+        self.voltage = voltage  # Applied voltage in volts
         self.E = self.voltage / self.distance_m  # Electric field strength
-        self.roomtempc = 20  # Room temperature in Celsius
-        self.density_oil = 0.861e3  # Density of oil in kg/m^3
+        self.roomtempc = roomtempc  # Room temperature in Celsius
+        self.density_oil = density_oil  # Density of oil in kg/m^3
         self.a_gravity = 9.81  # Acceleration due to gravity in m/s^2
 
+    def parameters(self):
+        """The calibration and experimental constants the charges are computed with, to store alongside them."""
+        return {
+            'pixels_mm': self.pixels_mm,
+            'fps': self.fps,
+            'pressure_torr': self.pressure_torr,
+            'distance_mm': self.distance_mm,
+            'voltage': self.voltage,
+            'roomtempc': self.roomtempc,
+            'density_oil': self.density_oil,
+        }
+
     def corrected_viscosity(self, vd):
         if vd <= 0:
             raise ValueError(f"Invalid downward velocity (vd): {vd}. Must be greater than 0.")
@@ -42,5 +68,74 @@ class ChargeCalculator:
         radius = self.find_radius(vd, viscosity_air)
         mass = self.find_mass(radius)
         charge = ((mass * self.a_gravity) + (6 * np.pi * viscosity_air * radius * vu)) / self.E
-        integer = charge / 1.602176634e-19  # Elementary charge
+        integer = charge / ELEMENTARY_CHARGE
         return charge, integer
+
+    def find_charges_and_integers(self, vu, vd):
+        """Vectorized find_charge_and_integer for arrays of velocities.
+
+        vu and vd are broadcast against each other. Entries where either velocity is not a
+        positive finite number are masked in the returned arrays instead of raising.
+        """
+        vu, vd = np.broadcast_arrays(np.asarray(vu, dtype=float), np.asarray(vd, dtype=float))
+        valid = (vu > 0) & (vd > 0) & np.isfinite(vu) & np.isfinite(vd)
+
+        # Substitute a harmless value for invalid entries so the math stays warning free
+        vu = np.where(valid, vu, 1.0)
+        vd = np.where(valid, vd, 1.0)
+
+        charge = charges_for(vu, vd, self.pressure_torr, self.distance_mm, self.voltage, self.roomtempc,
+                             self.density_oil, self.a_gravity)
+        integer = charge / ELEMENTARY_CHARGE
+        return np.ma.masked_array(charge, mask=~valid), np.ma.masked_array(integer, mask=~valid)
+
+    def velocities(self, slope_up, slope_down):
+        """Convert median pixel slopes per frame (find_pixel_slopes) to (vu, vd) in m/s with this calibration."""
+        # Same arithmetic as util.convert_to_mm_per_sec, so cached slopes give exactly the analyzed velocities
+        return np.abs((slope_up * self.fps) / self.pixels_mm) * 1e-3, np.abs((slope_down * self.fps) / self.pixels_mm) * 1e-3
+
+    def sweep(self, slope_up, slope_down, **grid):
+        """Charges and q/e of many droplets under every combination of calibration values, in one array operation.
+
+        slope_up and slope_down are the droplets' median rising and falling slopes in pixels
+        per frame, as kept by the analysis, so nothing is tracked again. Every keyword names
+        one of parameters() and gives the values to try; the others keep this calculator's
+        value. Returns masked (charges, integers) with one axis per swept parameter, in the
+        order given, followed by one axis for the droplets; droplets without both velocities
+        are masked.
+        """
+        values = self.parameters()
+        unknown = set(grid) - set(values)
+        if unknown:
+            raise ValueError(f"Unknown calibration parameters: {', '.join(sorted(unknown))}")
+        axes = len(grid) + 1
+        for axis, (name, grid_values) in enumerate(grid.items()):
+            shape = [1] * axes
+            shape[axis] = -1
+            values[name] = np.asarray(grid_values, dtype=float).reshape(shape)
+
+        slope_up = np.abs(np.asarray(slope_up, dtype=float))
+        slope_down = np.abs(np.asarray(slope_down, dtype=float))
+        valid = (slope_up > 0) & (slope_down > 0) & np.isfinite(slope_up) & np.isfinite(slope_down)
+        vu = (np.where(valid, slope_up, 1.0) * values['fps']) / values['pixels_mm'] * 1e-3
+        vd = (np.where(valid, slope_down, 1.0) * values['fps']) / values['pixels_mm'] * 1e-3
+
+        charge = charges_for(vu, vd, values['pressure_torr'], values['distance_mm'], values['voltage'],
+                             values['roomtempc'], values['density_oil'], self.a_gravity)
+        mask = np.broadcast_to(~valid, charge.shape)
+        return np.ma.masked_array(charge, mask=mask), np.ma.masked_array(charge / ELEMENTARY_CHARGE, mask=mask)
+
+    def find_charge_intervals(self, vu, vd, confidence=0.95):
+        """Confidence intervals of the charge and q/e from bootstrap replicates of the velocities.
+
+        Returns ((charge_low, charge_high), (integer_low, integer_high)), the percentile
+        intervals over the replicates whose velocities are valid.
+        """
+        charges, integers = self.find_charges_and_integers(vu, vd)
+        charges = charges.compressed()
+        if len(charges) == 0:
+            raise ValueError("No bootstrap replicate gives valid velocities")
+        tail = (1 - confidence) / 2 * 100
+        charge_low, charge_high = np.percentile(charges, [tail, 100 - tail])
+        integer_low, integer_high = np.percentile(integers.compressed(), [tail, 100 - tail])
+        return (float(charge_low), float(charge_high)), (float(integer_low), float(integer_high))
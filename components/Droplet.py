@@ -0,0 +1,86 @@
+import numpy as np
+from util import add_end_points, bootstrap_velocities, find_pixel_slopes
+from .ExtremumDetector import ExtremumDetector
+from .Trajectory import Trajectory
+
+class Droplet:
+    """One tracked droplet: its tracker, its trajectory and the incremental analysis of it.
+
+    Several droplets can be tracked against the same decoded frames. tracker is None once
+    the droplet needs no more tracking, e.g. when its trajectory came from the track cache.
+    """
+
+    def __init__(self, tracker, total_frames, roi_frame, roi, distance=100, prominence=100):
+        self.tracker = tracker
+        self.roi = tuple(roi)
+        self.roi_frame = roi_frame  # Frame the ROI was drawn on
+        self.trajectory = Trajectory(total_frames)
+        self.trajectory.record(roi_frame, roi)
+        self.analyzed_end = roi_frame + 1  # Frames before this one have been through the batch analysis
+        self.peak_detector = ExtremumDetector(distance=distance, prominence=prominence)
+        self.trough_detector = ExtremumDetector(distance=distance, prominence=prominence)
+        self.analysis = None  # (t, y, peaks, troughs, charge, integer) of the last analysis, for the chart
+        self.velocities = (None, None)  # (vu, vd) of the last analysis that found both
+        self.pixel_slopes = (None, None)  # Their median pixel slopes per frame, before calibration
+        # ((charge_low, charge_high), (integer_low, integer_high)) of the last analysis, when it bootstrapped them
+        self.uncertainty = None
+        self.line = None  # Its trajectory on the chart
+        self.box = None  # Its rectangle on the video canvas
+        self.color = 'blue'  # Outline color of that rectangle
+
+    def analyze(self, charge_calculator, end, resamples=0):
+        """Extend the analysis to the frames tracked before end.
+
+        Returns (frame indices, y-centers, peak positions, trough positions, charge, integer);
+        charge and integer are None while the trajectory does not give valid velocities yet.
+        With resamples, 95% intervals of the charge and q/e are bootstrapped into uncertainty.
+        """
+        self.analyzed_end = end
+        self.uncertainty = None
+        # Frame indices and pixel y-centers of the tracked frames since the ROI, read from the store
+        t, y = self.trajectory.y_centers(self.roi_frame + 1, end)
+        if len(y) == 0:
+            self.analysis = (t, y, np.array([], dtype=int), np.array([], dtype=int), None, None)
+            return self.analysis
+
+        # Only the tail of the trajectory that new data can still change is re-examined
+        peaks = self.peak_detector.update(y)
+        troughs = self.trough_detector.update(-y)
+        peaks, troughs = add_end_points(peaks, troughs, len(y))
+
+        peak_points = [(int(t[index]), float(y[index])) for index in peaks]
+        trough_points = [(int(t[index]), float(y[index])) for index in troughs]
+        try:
+            slope_up, slope_down = find_pixel_slopes(peak_points, trough_points)
+            vu, vd = charge_calculator.velocities(slope_up, slope_down)
+            self.pixel_slopes = (abs(float(slope_up)), abs(float(slope_down)))
+            self.velocities = (vu, vd)
+            charge, integer = charge_calculator.find_charge_and_integer(vu, vd)
+        except ValueError:
+            charge = integer = None
+        if charge is not None and resamples:
+            turning_points = np.sort(np.concatenate([t[peaks], t[troughs]]))
+            try:
+                vu_samples, vd_samples = bootstrap_velocities(
+                    t, y, turning_points, resamples, center=(vu, vd),
+                    fps=charge_calculator.fps, calibration=charge_calculator.pixels_mm,
+                )
+                self.uncertainty = charge_calculator.find_charge_intervals(vu_samples, vd_samples)
+            except ValueError:
+                pass  # No leg is long enough yet
+        self.analysis = (t, y, peaks, troughs, charge, integer)
+        return self.analysis
+
+    def discard_after(self, index, batch_size):
+        """Forget the results after frame index; returns True if analyzed batches were dropped."""
+        start = max(index, self.roi_frame) + 1
+        if start >= self.trajectory.end:
+            return False
+        self.trajectory.clear(start)
+        if self.analyzed_end <= start:
+            return False
+        # Fall back to the last batch that is still complete
+        self.analyzed_end = self.roi_frame + 1 + (start - self.roi_frame - 1) // batch_size * batch_size
+        self.peak_detector.reset()
+        self.trough_detector.reset()
+        return True
@@ -0,0 +1,156 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+class ExtremumDetector:
+    """Incremental find_peaks(y, distance=..., prominence=...) over a signal that only grows.
+
+    Each update only re-examines the tail that new samples can still change. A peak that is
+    the highest within `distance` of itself, and has no unseen samples within that distance,
+    is kept no matter what comes later and shields every earlier decision, so everything up
+    to the last such peak is final. Prominence can only grow as samples are appended, so a
+    peak that passes stays passed and one that fails is re-checked only until a higher
+    sample closes its right side.
+
+    Where maxima of equal height lie within distance of each other, which the half-pixel
+    y-centers of integer tracker boxes produce all the time, the leftmost of them is kept.
+    scipy keeps whichever of them numpy's unstable argsort over every maximum of the signal
+    puts last, an order that changes as the signal grows and that no window of it reproduces,
+    so only there can the two differ; everywhere else the result equals scipy's.
+    """
+
+    def __init__(self, distance=100, prominence=100):
+        self.distance = distance
+        self.prominence = prominence
+        self.reset()
+
+    def reset(self):
+        """Forget all state, e.g. after the signal was rewound."""
+        self.y = np.empty(0)
+        self.anchor = 0  # Local maxima are searched for in y[anchor:]
+        self.open_start = 0  # Maxima before this index are final
+        self.passed = []  # Final peaks that passed the prominence test
+        self.pending = []  # [peak, resume_index] of final peaks whose right side is still open
+
+    def update(self, y):
+        """Return the peak indices of y, whose first samples must be those of the previous call."""
+        y = np.asarray(y, dtype=float)
+        if len(y) < len(self.y):
+            self.reset()
+        self.y = y
+        if len(y) < 3:
+            return np.array([], dtype=np.intp)
+
+        # Imported here rather than at module level to keep scipy off the application's startup path
+        from scipy.signal import find_peaks
+        maxima, _ = find_peaks(y[self.anchor:])
+        maxima = maxima + self.anchor
+        maxima = maxima[maxima >= self.open_start]
+
+        # New maxima can only appear in the trailing run of equal samples
+        tail = y[self.anchor:]
+        changes = np.flatnonzero(tail[1:] != tail[:-1])
+        plateau_start = self.anchor + (changes[-1] + 1 if len(changes) else 0)
+
+        # A barrier removes every maximum within distance, so selecting over the whole window
+        # decides the maxima on either side of it as selecting each side alone would
+        selected = self._select_by_distance(maxima)
+        barrier = self._last_barrier(maxima, selected, plateau_start)
+        if barrier is not None:
+            for peak in selected[selected <= barrier]:
+                self._classify(peak)
+            self.anchor = barrier
+            self.open_start = barrier + self.distance
+            selected = selected[selected >= self.open_start]
+
+        # Pending peaks only need the samples that arrived since they were last checked
+        still_pending = []
+        for peak, resume in self.pending:
+            status, resume = self._scan_right(peak, resume)
+            if status == 'pass':
+                self.passed.append(peak)
+            elif status is None:
+                still_pending.append([peak, resume])
+        self.pending = still_pending
+
+        provisional = [peak for peak in selected if self._is_prominent(peak)]
+        return np.array(sorted(self.passed) + provisional, dtype=np.intp)
+
+    def _last_barrier(self, maxima, selected, plateau_start):
+        """Find the last maximum that outranks every maximum within distance and can no longer gain neighbours.
+
+        Nothing can remove such a maximum, so only the few that survive selection are candidates.
+        """
+        for peak in selected[::-1].tolist():
+            if plateau_start - peak < self.distance:
+                continue
+            j = np.searchsorted(maxima, peak)
+            lo = np.searchsorted(maxima, peak - self.distance, side='right')
+            hi = np.searchsorted(maxima, peak + self.distance, side='left')
+            height = self.y[peak]
+            # Equal maxima to the right lose to it, equal ones to the left win
+            if np.all(self.y[maxima[lo:j]] < height) and np.all(self.y[maxima[j + 1:hi]] <= height):
+                return peak
+        return None
+
+    def _select_by_distance(self, peaks):
+        """Greedy distance filter of find_peaks: higher peaks remove lower ones closer than distance, earlier ones equal ones."""
+        if len(peaks) == 0:
+            return peaks
+        order = np.lexsort((peaks, -self.y[peaks]))
+        # Plain lists: the loop runs once per kept peak, and bisect on a short list beats numpy calls
+        positions = peaks.tolist()
+        keep = [True] * len(positions)
+        for j in order.tolist():
+            if not keep[j]:
+                continue
+            lo = bisect_right(positions, positions[j] - self.distance)
+            hi = bisect_left(positions, positions[j] + self.distance)
+            keep[lo:j] = [False] * (j - lo)
+            keep[j + 1:hi] = [False] * (hi - j - 1)
+        return peaks[np.array(keep, dtype=bool)]
+
+    def _classify(self, peak):
+        """Record the prominence outcome of a peak whose distance decision is final."""
+        if not self._left_is_prominent(peak):
+            return
+        status, resume = self._scan_right(peak, peak + 1)
+        if status == 'pass':
+            self.passed.append(int(peak))
+        elif status is None:
+            self.pending.append([int(peak), resume])
+
+    def _is_prominent(self, peak):
+        return self._left_is_prominent(peak) and self._scan_right(peak, peak + 1)[0] == 'pass'
+
+    def _left_is_prominent(self, peak, chunk=512):
+        """Walk left until a higher sample; pass if a sample at least `prominence` lower comes first."""
+        height = self.y[peak]
+        stop = peak
+        while stop > 0:
+            start = max(0, stop - chunk)
+            segment = self.y[start:stop][::-1]
+            status = self._first_event(height, segment)
+            if status is not None:
+                return status == 'pass'
+            stop = start
+        return False
+
+    def _scan_right(self, peak, resume, chunk=512):
+        """Walk right from resume; returns ('pass' | 'fail' | None, index to resume from)."""
+        height = self.y[peak]
+        start = resume
+        while start < len(self.y):
+            stop = min(len(self.y), start + chunk)
+            status = self._first_event(height, self.y[start:stop])
+            if status is not None:
+                return status, stop
+            start = stop
+        return None, start
+
+    def _first_event(self, height, segment):
+        """Tell whether a sample `prominence` below height comes before a sample above it in segment."""
+        events = (segment > height) | ((height - segment) >= self.prominence)
+        first = np.argmax(events)
+        if not events[first]:
+            return None
+        return 'fail' if segment[first] > height else 'pass'
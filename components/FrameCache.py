@@ -0,0 +1,88 @@
+from collections import OrderedDict
+import threading
+import cv2
+
+class FrameCache:
+    """Memory-bounded LRU cache of resized display frames.
+
+    A miss decodes a short run of neighbouring frames with a single seek (ahead of the
+    requested frame when stepping forward, behind it when stepping backward), so repeated
+    scrubbing and frame stepping are served from RAM. With a FrameIndex the run is the part
+    of the requested frame's GOP up to read_ahead frames past it, which is what the seek
+    has to decode anyway. Cached frames are read-only; copy them before drawing on them.
+    """
+
+    def __init__(self, video, display_size, budget_mb=256, read_ahead=30, read_behind=30, frame_index=None):
+        self.video = video
+        self.frame_index = frame_index
+        self.display_size = display_size
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.read_ahead = read_ahead
+        self.read_behind = read_behind
+        self.total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.frames = OrderedDict()
+        self.nbytes = 0
+        self.last_index = 0
+        self.lock = threading.Lock()
+
+    def get(self, index):
+        """Return the display frame at index, or None if it cannot be read."""
+        if index < 0 or index >= self.total_frames:
+            return None
+
+        with self.lock:
+            frame = self.frames.get(index)
+            if frame is not None:
+                self.frames.move_to_end(index)
+
+        moving_backward = index < self.last_index
+        self.last_index = index
+        if frame is not None:
+            return frame
+
+        if self.frame_index is not None and len(self.frame_index.keyframes) < self.frame_index.total_frames:
+            start = self.frame_index.keyframe_before(index)
+            end = min(self.frame_index.gop_end(index), index + self.read_ahead)
+        elif moving_backward:
+            start, end = max(0, index - self.read_behind), index
+        else:
+            start, end = index, min(self.total_frames - 1, index + self.read_ahead)
+        self.decode_range(start, end)
+
+        with self.lock:
+            return self.frames.get(index)
+
+    def decode_range(self, start, end):
+        """Decode frames start..end (inclusive) sequentially after at most one seek and cache them."""
+        if int(self.video.get(cv2.CAP_PROP_POS_FRAMES)) != start:
+            self.seek(start)
+        for index in range(start, end + 1):
+            ret, frame = self.video.read()
+            if not ret:
+                break
+            self.put(index, cv2.resize(frame, self.display_size))
+
+    def seek(self, index):
+        """Position the capture so its next read() returns frame index."""
+        if self.frame_index is not None:
+            self.frame_index.seek(self.video, index)
+        else:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, index)
+
+    def put(self, index, frame):
+        """Add an already resized frame, evicting the least recently used frames over budget."""
+        frame.flags.writeable = False
+        with self.lock:
+            previous = self.frames.pop(index, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self.frames[index] = frame
+            self.nbytes += frame.nbytes
+            while self.nbytes > self.budget_bytes and len(self.frames) > 1:
+                _, evicted = self.frames.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.nbytes = 0
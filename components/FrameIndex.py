@@ -0,0 +1,99 @@
+import os
+import cv2
+import numpy as np
+from util import file_hash
+
+class FrameIndex:
+    """Keyframe positions and frame timestamps of a video, for exact seeks of bounded cost.
+
+    The index is built once with a packet-level pass that does not decode any frames and is
+    cached on disk keyed by the video's content hash, so reopening a video skips indexing.
+    Packets arrive in decode order, which with B-frames is not the order frames are shown
+    in, so they are sorted by timestamp and frames are numbered in presentation order.
+    """
+
+    def __init__(self, keyframes, timestamps):
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.total_frames = len(self.timestamps)
+
+    @classmethod
+    def load_or_build(cls, video_path, cache_dir):
+        """Load the cached index for video_path from cache_dir, building and saving it if needed."""
+        index_path = os.path.join(cache_dir, f"frame_index_{file_hash(video_path)}.npz")
+        if os.path.exists(index_path):
+            with np.load(index_path) as data:
+                return cls(data['keyframes'], data['timestamps'])
+
+        index = cls.build(video_path)
+        np.savez(index_path, keyframes=index.keyframes, timestamps=index.timestamps)
+        return index
+
+    @classmethod
+    def build(cls, video_path):
+        """Read every packet without decoding it and record which ones are keyframes."""
+        video = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+        keyframes = []
+        timestamps = []
+        key_flag_supported = False
+        if video.isOpened():
+            while video.grab():
+                is_key = video.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME)
+                key_flag_supported = key_flag_supported or is_key > 0
+                if is_key > 0:
+                    keyframes.append(len(timestamps))
+                timestamps.append(video.get(cv2.CAP_PROP_POS_MSEC))
+        video.release()
+
+        # Raw packets come in decode order; a frame's number is the rank of its presentation timestamp
+        order = np.argsort(timestamps, kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        timestamps = np.asarray(timestamps, dtype=np.float64)[order]
+        keyframes = np.sort(rank[np.asarray(keyframes, dtype=np.int64)])
+
+        if not key_flag_supported:
+            # Without keyframe information every frame is a seek target, which is plain CAP_PROP_POS_FRAMES seeking
+            video = cv2.VideoCapture(video_path)
+            total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = video.get(cv2.CAP_PROP_FPS) or 30
+            video.release()
+            timestamps = np.arange(total_frames) * 1000 / fps
+            keyframes = np.arange(total_frames)
+
+        return cls(keyframes, timestamps)
+
+    def keyframe_before(self, index):
+        """Return the last keyframe at or before index."""
+        position = np.searchsorted(self.keyframes, index, side='right') - 1
+        return int(self.keyframes[max(position, 0)])
+
+    def gop_end(self, index):
+        """Return the last frame of the group of pictures that contains index."""
+        position = np.searchsorted(self.keyframes, index, side='right')
+        if position >= len(self.keyframes):
+            return self.total_frames - 1
+        return int(self.keyframes[position]) - 1
+
+    def seek(self, video, index):
+        """Position video so its next read() returns frame index, decoding at most one GOP."""
+        key = self.keyframe_before(index)
+        while True:
+            video.set(cv2.CAP_PROP_POS_FRAMES, key)
+            position = self.next_frame(video, key)
+            if position <= index or key == 0:
+                break
+            # The container landed past the target, so start again from the keyframe before this one
+            key = self.keyframe_before(key - 1)
+
+        for _ in range(index - position):
+            video.grab()
+
+    def next_frame(self, video, expected):
+        """Work out from the capture timestamp which frame video.read() would return next."""
+        if expected == 0:
+            return 0
+        # After a seek the capture reports the timestamp of the frame just before its new position
+        timestamp = video.get(cv2.CAP_PROP_POS_MSEC)
+        previous = int(np.argmin(np.abs(self.timestamps - timestamp)))
+        return previous + 1
@@ -0,0 +1,147 @@
+import os
+import threading
+import cv2
+import numpy as np
+from util import file_hash
+
+class FrameProxy:
+    """Every frame of a video decoded once, resized and kept in a memory-mapped .npy file.
+
+    Repeated analyses of the same video (other ROIs, other trackers, other students) read
+    their frames straight from the mapping instead of decoding again, and processes that
+    open the same proxy share it through the page cache. The file lives next to the other
+    outputs of the video and is named after its content hash, size and color mode, so an
+    edited video or another display size gets a new proxy.
+    """
+
+    def __init__(self, path, fps):
+        self.path = path
+        self.frames = np.load(path, mmap_mode='r')
+        self.fps = fps
+
+    def __len__(self):
+        return len(self.frames)
+
+    @staticmethod
+    def path_for(video_path, cache_dir, size, grayscale=False):
+        mode = 'gray' if grayscale else 'bgr'
+        return os.path.join(cache_dir, f"proxy_{file_hash(video_path)}_{size[0]}x{size[1]}_{mode}.npy")
+
+    @classmethod
+    def load_or_build(cls, video_path, cache_dir, size, grayscale=False, progress=None):
+        """Open the proxy of video_path in cache_dir, decoding the video into it first if there is none.
+
+        progress, if given, is called as progress(frames decoded, frames expected) while building.
+        """
+        path = cls.path_for(video_path, cache_dir, size, grayscale)
+        video = cv2.VideoCapture(video_path)
+        if not video.isOpened():
+            raise ValueError(f"Could not open video {video_path}")
+        try:
+            fps = video.get(cv2.CAP_PROP_FPS) or 30.0
+            if not os.path.exists(path):
+                cls.build(video, path, size, grayscale, progress)
+        finally:
+            video.release()
+        return cls(path, fps)
+
+    @staticmethod
+    def build(video, path, size, grayscale=False, progress=None):
+        """Decode every frame of an open capture into a new proxy file at path."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        capacity = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        shape = (capacity, size[1], size[0]) if grayscale else (capacity, size[1], size[0], 3)
+        # Written under a temporary name, so other processes and threads never map a half-written proxy
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        trimmed = f"{temporary}.trim.npy"
+        try:
+            frames = np.lib.format.open_memmap(temporary, mode='w+', dtype=np.uint8, shape=shape)
+            count = 0
+            while count < capacity:
+                ret, frame = video.read()
+                if not ret:
+                    break
+                frame = cv2.resize(frame, size)
+                frames[count] = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if grayscale else frame
+                count += 1
+                if progress is not None and count % 30 == 0:
+                    progress(count, capacity)
+            frames.flush()
+            del frames
+
+            if count < capacity:
+                # The container over-reported its frame count; keep only the frames that decoded
+                with open(temporary, 'rb') as f:
+                    frames = np.load(f, mmap_mode='r')[:count]
+                    np.save(trimmed, frames)
+                del frames
+                os.replace(trimmed, temporary)
+            os.replace(temporary, path)
+        except BaseException:
+            # A failed or interrupted build leaves nothing behind; the next open starts over
+            for leftover in (temporary, trimmed):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            raise
+
+    def capture(self):
+        return ProxyCapture(self)
+
+class ProxyCapture:
+    """The part of the cv2.VideoCapture interface the application uses, reading from a FrameProxy.
+
+    Seeks are exact and free. read() returns read-only views of the mapping, and grayscale
+    proxies are expanded to BGR so every reader gets the frames it expects.
+    """
+
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.frames = proxy.frames
+        self.position = 0  # Index of the frame the next read() returns
+
+    def isOpened(self):
+        return self.frames is not None
+
+    def release(self):
+        self.frames = None
+
+    def grab(self):
+        if self.position >= len(self.frames):
+            return False
+        self.position += 1
+        return True
+
+    def retrieve(self):
+        if self.position == 0:
+            return False, None
+        frame = self.frames[self.position - 1]
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        return True, frame
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.frames))
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.proxy.fps)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.frames.shape[2])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.frames.shape[1])
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            # Like OpenCV, the timestamp of the frame read last
+            return max(0, self.position - 1) * 1000.0 / self.proxy.fps
+        return 0.0
+
+    def set(self, prop, value):
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self.position = int(min(max(value, 0), len(self.frames)))
+        return True
@@ -0,0 +1,50 @@
+import hashlib
+import os
+
+class ImageCache:
+    """Bitmaps for the instruction pages, rendered once and kept as PNG files.
+
+    Tk reads PNG files natively, so the cached equations and images load as plain
+    tk.PhotoImage objects without matplotlib, mathtext or a resampling pass at startup.
+    Files are named after a hash of everything that affects their pixels, so changing an
+    equation or replacing a source image renders a new file.
+    """
+
+    def __init__(self, cache_dir=os.path.join('media', 'cache')):
+        self.cache_dir = cache_dir
+
+    def _path(self, prefix, *key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{prefix}_{digest}.png")
+
+    def equation(self, latex, figsize, dpi=100, fontsize=16):
+        """Path of a PNG of latex centred on a white figsize canvas, rendering it on first use."""
+        path = self._path('equation', latex, tuple(figsize), dpi, fontsize)
+        if not os.path.exists(path):
+            # Only a cache miss pays for matplotlib's mathtext
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+            figure = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(figure)
+            ax = figure.add_subplot(111)
+            ax.axis('off')
+            ax.text(0.5, 0.5, latex, fontsize=fontsize, ha='center', va='center', transform=ax.transAxes)
+            self._save(path, lambda temporary: figure.savefig(temporary, dpi=dpi, format='png'))
+        return path
+
+    def resized(self, source, size):
+        """Path of a PNG of the image at source resized to size, resampling it on first use."""
+        stat = os.stat(source)
+        path = self._path('image', os.path.basename(source), stat.st_size, stat.st_mtime_ns, tuple(size))
+        if not os.path.exists(path):
+            from PIL import Image
+            image = Image.open(source).resize(size, Image.Resampling.LANCZOS)
+            self._save(path, lambda temporary: image.save(temporary, format='png'))
+        return path
+
+    def _save(self, path, write):
+        # Write to a temporary name first so an interrupted render never leaves a truncated PNG
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        write(temporary)
+        os.replace(temporary, path)
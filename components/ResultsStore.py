@@ -0,0 +1,237 @@
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+from .ElementaryChargeEstimator import ElementaryChargeEstimator
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    cohort TEXT NOT NULL,
+    video TEXT NOT NULL,
+    droplet INTEGER,
+    roi_frame INTEGER NOT NULL,
+    x INTEGER NOT NULL, y INTEGER NOT NULL, w INTEGER NOT NULL, h INTEGER NOT NULL,
+    tracker TEXT NOT NULL,
+    crop INTEGER NOT NULL,
+    vu REAL, vd REAL, charge REAL, integer REAL,
+    slope_up REAL, slope_down REAL,
+    calibration TEXT,
+    created REAL,
+    UNIQUE (cohort, video, roi_frame, x, y, w, h, tracker, crop)
+);
+CREATE INDEX IF NOT EXISTS results_video ON results (video);
+CREATE TABLE IF NOT EXISTS aggregates (
+    cohort TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    sum_x REAL NOT NULL,
+    sum_xx REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS histogram (
+    cohort TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (cohort, bin)
+) WITHOUT ROWID;
+"""
+
+RESULT_COLUMNS = ['id', 'cohort', 'video', 'droplet', 'roi_frame', 'x', 'y', 'w', 'h', 'tracker', 'crop',
+                  'vu', 'vd', 'charge', 'integer', 'slope_up', 'slope_down', 'calibration', 'created']
+
+class ResultsStore:
+    """Every droplet result analyzed on this machine, in one SQLite database under output/.
+
+    A droplet is identified by its cohort (a free label such as a class or a session), the
+    absolute path of its video, the frame its ROI was drawn on, the ROI, the tracker and
+    whether cropped tracking was used; storing it again replaces the earlier result.
+    Alongside the rows, per-cohort running sums of q/e and a histogram of q/e in bins of
+    bin_width are updated in the same transaction as each insert, so the counts and the
+    histogram over thousands of droplets are read back without touching the rows.
+    """
+
+    bin_width = 0.1  # q/e per histogram bin
+
+    def __init__(self, path=os.path.join('output', 'results.sqlite')):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def add(self, video, roi, vu, vd, charge, integer, tracker, calibration=None, cohort='', roi_frame=0,
+            droplet=None, crop=False, slope_up=None, slope_down=None):
+        """Store one droplet's result, replacing an earlier result for the same droplet; returns its row id.
+
+        slope_up and slope_down are the median rising and falling speeds in pixels per frame
+        the velocities were converted from, kept for recalibrating without tracking again.
+        """
+        return self.add_many([dict(video=video, roi=roi, vu=vu, vd=vd, charge=charge, integer=integer, tracker=tracker,
+                                   calibration=calibration, cohort=cohort, roi_frame=roi_frame, droplet=droplet,
+                                   crop=crop, slope_up=slope_up, slope_down=slope_down)])[0]
+
+    def add_many(self, results):
+        """Store several results, given as dicts of add()'s arguments, in one transaction; returns their row ids."""
+        ids = []
+        with self.connection:
+            for result in results:
+                result = {'calibration': None, 'cohort': '', 'roi_frame': 0, 'droplet': None, 'crop': False,
+                          'slope_up': None, 'slope_down': None, **result}
+                cohort, roi, integer = result['cohort'], result['roi'], result['integer']
+                x, y, w, h = (int(v) for v in roi)
+                key = (cohort, os.path.abspath(result['video']), int(result['roi_frame']), x, y, w, h, result['tracker'],
+                       int(bool(result['crop'])))
+                previous = self.connection.execute(
+                    "SELECT id, integer FROM results WHERE cohort = ? AND video = ? AND roi_frame = ? "
+                    "AND x = ? AND y = ? AND w = ? AND h = ? AND tracker = ? AND crop = ?", key,
+                ).fetchone()
+                if previous is not None:
+                    self._apply(cohort, previous[1], -1)
+                    self.connection.execute("DELETE FROM results WHERE id = ?", (previous[0],))
+
+                integer = self._number(integer)
+                cursor = self.connection.execute(
+                    "INSERT INTO results (cohort, video, roi_frame, x, y, w, h, tracker, crop, droplet, vu, vd, charge, "
+                    "integer, slope_up, slope_down, calibration, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    key + (result['droplet'], self._number(result['vu']), self._number(result['vd']),
+                           self._number(result['charge']), integer,
+                           self._number(result['slope_up']), self._number(result['slope_down']),
+                           json.dumps(result['calibration']) if result['calibration'] is not None else None, time.time()),
+                )
+                self._apply(cohort, integer, 1)
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def _apply(self, cohort, integer, sign):
+        """Add (sign=1) or remove (sign=-1) one q/e value from the running aggregates of its cohort."""
+        if integer is None:
+            return  # Droplets without a valid charge are kept but not counted
+        self.connection.execute(
+            "INSERT INTO aggregates (cohort, count, sum_x, sum_xx) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (cohort) DO UPDATE SET count = count + excluded.count, sum_x = sum_x + excluded.sum_x, "
+            "sum_xx = sum_xx + excluded.sum_xx",
+            (cohort, sign, sign * integer, sign * integer * integer),
+        )
+        self.connection.execute(
+            "INSERT INTO histogram (cohort, bin, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (cohort, bin) DO UPDATE SET count = count + excluded.count",
+            (cohort, int(np.floor(integer / self.bin_width)), sign),
+        )
+
+    @staticmethod
+    def _number(value):
+        if value is None:
+            return None
+        value = float(value)
+        return value if np.isfinite(value) else None
+
+    def results(self, video=None, cohort=None, tracker=None):
+        """Return the stored results as dicts, oldest first, optionally only those of a video, cohort or tracker.
+
+        video is a path to the video, relative to the working directory or absolute.
+        """
+        conditions, parameters = [], []
+        for column, value in (('video', video), ('cohort', cohort), ('tracker', tracker)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(os.path.abspath(value) if column == 'video' else value)
+        query = f"SELECT {', '.join(RESULT_COLUMNS)} FROM results"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        rows = []
+        for values in self.connection.execute(query + " ORDER BY id", parameters):
+            row = dict(zip(RESULT_COLUMNS, values))
+            row['calibration'] = json.loads(row['calibration']) if row['calibration'] else None
+            rows.append(row)
+        return rows
+
+    def charges(self, cohort=None):
+        """Return the valid charges of a cohort (default: all), in Coulombs, as an array."""
+        query = "SELECT charge FROM results WHERE integer IS NOT NULL"
+        parameters = ()
+        if cohort is not None:
+            query += " AND cohort = ?"
+            parameters = (cohort,)
+        return np.array([row[0] for row in self.connection.execute(query, parameters)], dtype=float)
+
+    def slopes(self, cohort=None):
+        """Return (slope_up, slope_down) arrays in pixels per frame of the droplets of a cohort (default: all).
+
+        Only droplets stored with both slopes are included; ChargeCalculator.sweep() turns
+        them into charges under any calibration.
+        """
+        query = "SELECT slope_up, slope_down FROM results WHERE slope_up IS NOT NULL AND slope_down IS NOT NULL"
+        parameters = ()
+        if cohort is not None:
+            query += " AND cohort = ?"
+            parameters = (cohort,)
+        slopes = np.array(self.connection.execute(query + " ORDER BY id", parameters).fetchall(), dtype=float)
+        if len(slopes) == 0:
+            return np.zeros(0), np.zeros(0)
+        return slopes[:, 0], slopes[:, 1]
+
+    def cohorts(self):
+        return [row[0] for row in self.connection.execute("SELECT cohort FROM aggregates WHERE count > 0 ORDER BY cohort")]
+
+    def summary(self, cohort=None):
+        """Return the count, mean and standard deviation of the stored q/e values of a cohort (default: all of them).
+
+        'elementary_charge', its 'stderr' and 'rms_residual' are ElementaryChargeEstimator's
+        estimate from the stored charges, None when there is none. Unlike the other entries
+        they are not kept up to date by add(): the estimator reads the charge of every stored
+        droplet of the cohort, which takes about 20 ms per 10^5 droplets.
+        """
+        query = "SELECT SUM(count), SUM(sum_x), SUM(sum_xx) FROM aggregates"
+        parameters = ()
+        if cohort is not None:
+            query += " WHERE cohort = ?"
+            parameters = (cohort,)
+        count, sum_x, sum_xx = self.connection.execute(query, parameters).fetchone()
+        count = int(count or 0)
+        summary = {'count': count, 'mean': None, 'std': None, 'elementary_charge': None, 'stderr': None,
+                   'rms_residual': None}
+        if count == 0:
+            return summary
+        mean = sum_x / count
+        summary['mean'] = mean
+        summary['std'] = float(np.sqrt(max(0.0, sum_xx / count - mean * mean)))
+        try:
+            estimate = ElementaryChargeEstimator().estimate(self.charges(cohort))
+        except ValueError:
+            return summary  # Fewer than two valid charges, or none near a multiple of the search range
+        for key in ('elementary_charge', 'stderr', 'rms_residual'):
+            summary[key] = estimate[key]
+        return summary
+
+    def histogram(self, cohort=None, extra=(), bars=None):
+        """Return (counts, edges) of the stored q/e values of a cohort (default: all), like np.histogram.
+
+        Values in extra are counted as well without being stored, e.g. the droplets of the
+        session in progress. With bars, the bins are merged into that many bars spanning
+        the occupied range; otherwise they are bin_width wide.
+        """
+        query = "SELECT bin, SUM(count) FROM histogram"
+        parameters = ()
+        if cohort is not None:
+            query += " WHERE cohort = ?"
+            parameters = (cohort,)
+        stored = self.connection.execute(query + " GROUP BY bin HAVING SUM(count) > 0", parameters).fetchall()
+        extra = np.asarray(extra, dtype=float)
+        bins = np.concatenate([np.array([row[0] for row in stored], dtype=np.int64),
+                               np.floor(extra[np.isfinite(extra)] / self.bin_width).astype(np.int64)])
+        weights = np.concatenate([np.array([row[1] for row in stored], dtype=np.int64),
+                                  np.ones(np.isfinite(extra).sum(), dtype=np.int64)])
+        if len(bins) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+
+        first = bins.min()
+        counts = np.bincount(bins - first, weights=weights).astype(np.int64)
+        group = 1 if bars is None else max(1, -(-len(counts) // bars))
+        if bars is not None:
+            counts = np.pad(counts, (0, bars * group - len(counts)))
+            counts = counts.reshape(bars, group).sum(axis=1)
+        edges = (first + np.arange(len(counts) + 1) * group) * self.bin_width
+        return counts, edges
@@ -0,0 +1,119 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+import numpy as np
+
+class _NoOpStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+# Shared by every disabled timer, so a disabled hook allocates nothing and reads no clock
+_NO_OP_STAGE = _NoOpStage()
+
+class _Stage:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class StageTimer:
+    """Rolling timings of the named stages of the playback loop.
+
+    Wrap a stage in `with timer.stage('decode'):`. The last `window` durations of each stage
+    are kept for percentiles, and mark() counts events such as displayed frames to derive
+    a rate. Stages run on the pipeline threads as well as the Tk thread, so recording takes
+    a lock. While disabled, stage() returns a shared no-op context manager and mark() returns
+    immediately.
+    """
+
+    def __init__(self, enabled=False, window=600):
+        self.enabled = enabled
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.counts = {}
+        self.events = {}
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NO_OP_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def mark(self, name):
+        """Count one event, e.g. a displayed frame, for rate()."""
+        if not self.enabled:
+            return
+        with self.lock:
+            events = self.events.get(name)
+            if events is None:
+                events = self.events[name] = deque(maxlen=self.window)
+            events.append(time.perf_counter())
+
+    def rate(self, name):
+        """Events per second over the recent window, or None with fewer than two events."""
+        with self.lock:
+            events = self.events.get(name)
+            if not events or len(events) < 2 or events[-1] == events[0]:
+                return None
+            return (len(events) - 1) / (events[-1] - events[0])
+
+    def stats(self):
+        """Per stage: total count and the mean, p50, p95 and p99 in milliseconds of the recent window."""
+        with self.lock:
+            snapshot = {name: (np.array(samples), self.counts[name]) for name, samples in self.samples.items()}
+        stats = {}
+        for name, (samples, count) in snapshot.items():
+            samples = samples * 1e3
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            stats[name] = {
+                'count': count,
+                'mean_ms': float(samples.mean()),
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+            }
+        return stats
+
+    def export(self, path):
+        """Write stats() and the event rates to path, as JSON or, for a .csv path, as CSV."""
+        stats = self.stats()
+        rates = {name: self.rate(name) for name in list(self.events)}
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['name', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'per_second'])
+                for name, values in stats.items():
+                    writer.writerow([name, values['count']] + [f"{values[key]:.4f}" for key in ('mean_ms', 'p50_ms', 'p95_ms', 'p99_ms')] + [''])
+                for name, rate in rates.items():
+                    writer.writerow([name, '', '', '', '', '', '' if rate is None else f"{rate:.2f}"])
+        else:
+            with open(path, 'w') as f:
+                json.dump({'stages': stats, 'rates_per_second': rates}, f, indent=2)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+            self.events.clear()
@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+
+class TemplateTracker:
+    """Minimal tracker that template-matches the initial droplet patch near its last position.
+
+    It follows the OpenCV tracker interface (init/update), so it can stand in for CSRT.
+    Droplets keep their appearance and move a few pixels per frame, so a normalized
+    cross-correlation over a small search window is usually enough and costs far less.
+    """
+
+    def __init__(self, search_margin=16, min_score=0.4):
+        self.search_margin = search_margin
+        self.min_score = min_score
+        self.template = None
+        self.bbox = None
+        self.score = float('nan')  # Correlation of the last match
+
+    def init(self, frame, bbox):
+        x, y, w, h = (int(v) for v in bbox)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        self.template = gray[y:y + h, x:x + w].copy()
+        self.bbox = (x, y, w, h)
+
+    def update(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        x, y, w, h = self.bbox
+        frame_height, frame_width = gray.shape
+
+        # Search window around the last position, clipped to the frame
+        x0 = max(0, x - self.search_margin)
+        y0 = max(0, y - self.search_margin)
+        x1 = min(frame_width, x + w + self.search_margin)
+        y1 = min(frame_height, y + h + self.search_margin)
+        window = gray[y0:y1, x0:x1]
+        if window.shape[0] < h or window.shape[1] < w:
+            return False, self.bbox
+
+        scores = cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED)
+        _, best_score, _, best_location = cv2.minMaxLoc(scores)
+        self.score = best_score
+        if not np.isfinite(best_score) or best_score < self.min_score:
+            return False, self.bbox
+
+        self.bbox = (x0 + best_location[0], y0 + best_location[1], w, h)
+        return True, self.bbox
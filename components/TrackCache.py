@@ -0,0 +1,45 @@
+import hashlib
+import os
+import numpy as np
+from util import file_hash
+
+class TrackCache:
+    """Tracking results of one video stored under output/<video>/.
+
+    Entries are keyed by the video's content hash, the frame the ROI was drawn on, the ROI
+    itself, the tracker, whether cropped tracking was used, the stride of runs that did not
+    track every frame and the mode of runs on a frame proxy, so reopening a video with the
+    same ROI loads the trajectory instead of tracking it again.
+    """
+
+    def __init__(self, video_path, cache_dir):
+        self.cache_dir = cache_dir
+        self.video_hash = file_hash(video_path)
+
+    def path_for(self, start_frame, roi, tracker_name, crop=False, sampling=None, proxy=None):
+        # proxy is 'bgr' or 'gray': proxy frames are resized, and gray ones lose colour, so they track differently
+        sampling = None if sampling is None else tuple(sampling)
+        key = f"{self.video_hash}|{start_frame}|{tuple(int(v) for v in roi)}|{tracker_name}|{bool(crop)}|{sampling}|{proxy}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"track_{digest}.npz")
+
+    def load(self, start_frame, roi, tracker_name, crop=False, sampling=None, proxy=None):
+        """Return (frame indices, bboxes) of a previous run, or None if there is none."""
+        path = self.path_for(start_frame, roi, tracker_name, crop, sampling, proxy)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return data['frames'], data['bboxes']
+
+    def save(self, start_frame, roi, tracker_name, frames, bboxes, crop=False, sampling=None, proxy=None):
+        """Store the bboxes of the frames tracked after start_frame."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        np.savez_compressed(
+            self.path_for(start_frame, roi, tracker_name, crop, sampling, proxy),
+            frames=np.asarray(frames, dtype=np.int32),
+            bboxes=np.asarray(bboxes, dtype=np.float32).reshape(-1, 4),
+            roi=np.asarray(roi, dtype=np.int32),
+            start_frame=np.int32(start_frame),
+            tracker=np.array(tracker_name),
+            crop=np.bool_(crop),
+        )
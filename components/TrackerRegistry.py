@@ -0,0 +1,18 @@
+import cv2
+from .TemplateTracker import TemplateTracker
+
+# Tracker name -> factory. MOSSE lives in the legacy module of opencv-contrib-python.
+TRACKERS = {
+    'CSRT': lambda: cv2.TrackerCSRT_create(),
+    'KCF': lambda: cv2.TrackerKCF_create(),
+    'MOSSE': lambda: cv2.legacy.TrackerMOSSE_create(),
+    'TEMPLATE': TemplateTracker,
+}
+DEFAULT_TRACKER = 'CSRT'
+
+def create_tracker(name=DEFAULT_TRACKER):
+    """Create a new tracker by its registry name (case-insensitive)."""
+    factory = TRACKERS.get(name.upper())
+    if factory is None:
+        raise ValueError(f"Unknown tracker '{name}'. Choose one of: {', '.join(TRACKERS)}")
+    return factory()
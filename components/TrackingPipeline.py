@@ -0,0 +1,178 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from .StageTimer import StageTimer
+
+class TrackingPipeline:
+    """Decode and track video frames on background threads, off the Tk event loop.
+
+    A decoder thread reads and resizes frames into a bounded queue and a tracking thread runs
+    the trackers over them in order. The GUI drains the tracking results with get_results()
+    and only ever displays the most recent frame from get_latest_frame(). OpenCV releases
+    the GIL while decoding and tracking, so both stages overlap with each other and with
+    Tk redraws.
+
+    With pace_fps the decoder hands out frames no faster than that rate, for real-time
+    playback; otherwise it runs as fast as decoding and tracking allow.
+
+    Every tracker in `trackers` (one per droplet) updates on the same decoded frame, so the
+    decode cost is shared; with several trackers the updates run on a small thread pool.
+    A None entry is a droplet that needs no tracking and always reports ok=False.
+    """
+
+    def __init__(self, video, trackers, start_frame, display_size, queue_size=32, frame_cache=None, track_native=False,
+                 timer=None, workers=4, pace_fps=None):
+        self.video = video
+        self.frame_cache = frame_cache
+        # A CroppedTracker wants the native frame; the display copy is still made for the GUI
+        self.track_native = track_native
+        self.trackers = list(trackers)
+        self.workers = workers
+        self.pace_fps = pace_fps
+        self.start_frame = start_frame
+        self.display_size = display_size
+        # Times decode, resize and tracker.update; a disabled timer makes the hooks no-ops
+        self.timer = timer if timer is not None else StageTimer()
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.results = queue.Queue()
+        self.latest_frame = None
+        self.latest_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.finished = False
+        self.threads = []
+
+    def start(self):
+        # Only seek when the capture is not already positioned on the first frame we need
+        if int(self.video.get(cv2.CAP_PROP_POS_FRAMES)) != self.start_frame:
+            if self.frame_cache is not None:
+                self.frame_cache.seek(self.start_frame)
+            else:
+                self.video.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+
+        self.threads = [
+            threading.Thread(target=self._decode_loop, daemon=True),
+            threading.Thread(target=self._track_loop, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """Stop both threads. Frames that were tracked before stopping remain in get_results()."""
+        self.stop_event.set()
+        # Unblock a decoder waiting on a full queue; undecoded frames are simply read again on restart
+        while self.threads[0].is_alive():
+            self._drain(self.frames)
+            self.threads[0].join(timeout=0.05)
+        self._drain(self.frames)
+        self.threads[1].join()
+
+    def get_results(self):
+        """Return every (frame_index, [(ok, bbox, score) per tracker]) result ready so far, oldest first.
+
+        score is the tracker's confidence for trackers that report one and NaN otherwise.
+        """
+        results = []
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                return results
+            if result is None:
+                self.finished = True
+                return results
+            results.append(result)
+
+    def get_latest_frame(self):
+        """Return the most recently tracked (frame_index, frame, [(ok, bbox, score) per tracker]), or None if nothing new."""
+        with self.latest_lock:
+            latest, self.latest_frame = self.latest_frame, None
+        return latest
+
+    def _decode_loop(self):
+        index = self.start_frame
+        timer = self.timer
+        started = time.perf_counter()
+        while not self.stop_event.is_set():
+            if self.pace_fps:
+                # Frame n after the start is due n / fps seconds after it
+                delay = started + (index - self.start_frame) / self.pace_fps - time.perf_counter()
+                if delay > 0 and self.stop_event.wait(delay):
+                    return
+            with timer.stage('decode'):
+                ret, frame = self.video.read()
+            if not ret:
+                self._put(None)
+                return
+            with timer.stage('resize'):
+                display_frame = cv2.resize(frame, self.display_size)
+            if self.frame_cache is not None:
+                # Played frames are kept so stepping back after a pause needs no decoding
+                self.frame_cache.put(index, display_frame)
+            tracked_frame = frame if self.track_native else display_frame
+            if not self._put((index, tracked_frame, display_frame)):
+                return
+            index += 1
+
+    def _track_loop(self):
+        timer = self.timer
+        pool = None
+        if sum(tracker is not None for tracker in self.trackers) > 1:
+            pool = ThreadPoolExecutor(max_workers=min(self.workers, len(self.trackers)))
+        try:
+            self._run_trackers(pool, timer)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False)
+
+    @staticmethod
+    def _update(tracker, frame):
+        if tracker is None:
+            return False, None, float('nan')
+        ok, bbox = tracker.update(frame)
+        return ok, bbox, getattr(tracker, 'score', float('nan'))
+
+    def _run_trackers(self, pool, timer):
+        while True:
+            try:
+                item = self.frames.get(timeout=0.05)
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    return
+                continue
+
+            if item is None:
+                self.results.put(None)
+                return
+
+            index, tracked_frame, display_frame = item
+            with timer.stage('tracker_update'):
+                if pool is None:
+                    results = [self._update(tracker, tracked_frame) for tracker in self.trackers]
+                else:
+                    results = list(pool.map(self._update, self.trackers, [tracked_frame] * len(self.trackers)))
+            with self.latest_lock:
+                self.latest_frame = (index, display_frame, results)
+            # Results are never dropped once tracked, so the tracker state and the GUI data stay in sync
+            self.results.put((index, results))
+            if self.stop_event.is_set():
+                return
+
+    def _put(self, item):
+        """Put into the bounded frame queue while still reacting to stop(); returns False when stopped."""
+        while not self.stop_event.is_set():
+            try:
+                self.frames.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _drain(source):
+        while True:
+            try:
+                source.get_nowait()
+            except queue.Empty:
+                return
@@ -0,0 +1,77 @@
+import numpy as np
+
+TRAJECTORY_DTYPE = np.dtype([
+    ('bbox', np.float32, 4),
+    ('y_center', np.float32),
+    ('valid', np.bool_),
+    ('score', np.float32),
+])
+
+class Trajectory:
+    """Tracking results of one video in a structured array with one record per frame.
+
+    The array is allocated once for the whole video, so recording a frame is a single
+    assignment, rewinding clears a range and analysis reads slices of it directly instead
+    of converting lists of tuples.
+    """
+
+    def __init__(self, total_frames):
+        self.data = np.zeros(total_frames, dtype=TRAJECTORY_DTYPE)
+        self.data['score'] = np.nan
+        self.end = 0  # One past the last frame with a result
+
+    def __len__(self):
+        return len(self.data)
+
+    def resize(self, total_frames):
+        """Make room for total_frames frames, keeping the results recorded so far."""
+        if total_frames > len(self.data):
+            data = np.zeros(total_frames, dtype=TRAJECTORY_DTYPE)
+            data['score'] = np.nan
+            data[:len(self.data)] = self.data
+            self.data = data
+
+    def record(self, index, bbox, score=np.nan):
+        self.data[index] = (bbox, bbox[1] + bbox[3] / 2, True, score)
+        self.end = max(self.end, index + 1)
+
+    def record_many(self, frames, bboxes, scores=np.nan):
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        self.data['bbox'][frames] = bboxes
+        self.data['y_center'][frames] = bboxes[:, 1] + bboxes[:, 3] / 2
+        self.data['valid'][frames] = True
+        self.data['score'][frames] = scores
+        if len(frames):
+            self.end = max(self.end, int(np.max(frames)) + 1)
+
+    def bbox(self, index):
+        """The bbox recorded for frame index as a tuple, or None."""
+        if not 0 <= index < len(self.data) or not self.data['valid'][index]:
+            return None
+        return tuple(self.data['bbox'][index].tolist())
+
+    def clear(self, start, stop=None):
+        """Forget the results of frames start to stop (default: to the end)."""
+        stop = len(self.data) if stop is None else stop
+        self.data[start:stop] = (0, 0, False, np.nan)
+        if stop >= self.end:
+            valid = np.flatnonzero(self.data['valid'][:min(start, self.end)])
+            self.end = int(valid[-1]) + 1 if len(valid) else 0
+
+    def frames(self, start=0, stop=None):
+        """Indices of the frames with a result between start and stop."""
+        stop = self.end if stop is None else stop
+        return start + np.flatnonzero(self.data['valid'][start:stop])
+
+    def y_centers(self, start=0, stop=None):
+        """(frame indices, y-centers) of the frames with a result between start and stop.
+
+        When every frame in the range was tracked, the y-centers are a view into the store.
+        """
+        stop = self.end if stop is None else stop
+        valid = self.data['valid'][start:stop]
+        y = self.data['y_center'][start:stop]
+        if valid.all():
+            return np.arange(start, start + len(y)), y
+        frames = np.flatnonzero(valid)
+        return start + frames, y[frames]
@@ -0,0 +1,267 @@
+import os
+from collections import deque
+import cv2
+import numpy as np
+from util import bootstrap_velocities, find_leg_pixel_slopes, find_peaks_and_troughs, find_pixel_slopes, output_dir_for
+from .ChargeCalculator import ChargeCalculator
+from .CroppedTracker import CroppedTracker
+from .DropletDetector import DropletDetector
+from .FrameProxy import FrameProxy
+from .TrackCache import TrackCache
+from .TrackerRegistry import DEFAULT_TRACKER, create_tracker
+
+class VideoAnalyzer:
+    """Run the tracking and charge analysis for a whole video without the GUI."""
+
+    def __init__(self, display_width=512, display_height=512, tracker_name=DEFAULT_TRACKER, crop=False, use_cache=True,
+                 stride=1, max_stride=None, steady_tolerance=0.25, use_proxy=False, proxy_grayscale=False, bootstrap=0,
+                 calibration=None):
+        # ROIs and trajectories are in the display coordinates of the GUI, so ROIs drawn in the app can be reused
+        self.display_width = display_width
+        self.display_height = display_height
+        self.tracker_name = tracker_name
+        # Track inside a native-resolution window around the droplet instead of the resized frame
+        self.crop = crop
+        # Reuse trajectories stored under output/<video>/ by earlier runs, in the GUI or in batch mode
+        self.use_cache = use_cache
+        # Track every stride-th frame only; the frames in between are grabbed but never converted,
+        # resized or tracked. With a larger max_stride the stride doubles, up to max_stride, while
+        # every droplet moves steadily, and falls back to stride when one turns or is lost.
+        self.stride = max(1, int(stride))
+        self.max_stride = max(self.stride, int(max_stride or self.stride))
+        # Largest relative change of velocity between two intervals that still counts as steady
+        self.steady_tolerance = steady_tolerance
+        # Read the display-size frames from a memory-mapped proxy under output/<video>/, decoding
+        # the video into it on first use; cropped tracking needs native frames and always decodes
+        self.use_proxy = use_proxy
+        self.proxy_grayscale = proxy_grayscale
+        # Bootstrap resamples for the 95% intervals of the charge and q/e; 0 skips them
+        self.bootstrap = bootstrap
+        # Keyword arguments of ChargeCalculator for lab conditions other than its defaults
+        self.charge_calculator = ChargeCalculator(**(calibration or {}))
+
+    def sampling(self):
+        """Description of the frame sampling for the track cache; None when every frame is tracked."""
+        if self.max_stride == 1:
+            return None
+        return (self.stride, self.max_stride)
+
+    def proxy_mode(self):
+        """Description of the frames tracked for the track cache; None when they are decoded from the video."""
+        if not self.use_proxy or self.crop:
+            return None
+        return 'gray' if self.proxy_grayscale else 'bgr'
+
+    def open_video(self, video_path):
+        """Open video_path for reading: its frame proxy when proxies are used, otherwise the video itself."""
+        if self.use_proxy and not self.crop:
+            size = (self.display_width, self.display_height)
+            return FrameProxy.load_or_build(video_path, output_dir_for(video_path), size, self.proxy_grayscale).capture()
+        return cv2.VideoCapture(video_path)
+
+    def detect_rois(self, video_path, max_droplets=None):
+        """Return the ROIs of the droplets DropletDetector finds at the start of the video, best first."""
+        detector = DropletDetector()
+        video = self.open_video(video_path)
+        if not video.isOpened():
+            raise ValueError(f"Could not open video {video_path}")
+        try:
+            frames = detector.read(video, (self.display_width, self.display_height))
+        finally:
+            video.release()
+        proposals = detector.detect(frames) if frames else []
+        return [proposal['bbox'] for proposal in proposals[:max_droplets]]
+
+    def track(self, video_path, bbox):
+        """Track the droplet inside bbox and return (frame indices, bboxes) of the successfully tracked frames."""
+        return self.track_many(video_path, [bbox])[0]
+
+    def track_many(self, video_path, bboxes):
+        """Track the droplet inside each of bboxes in one pass over the video.
+
+        Every tracked frame is decoded and resized once and each tracker is updated on it. Returns
+        (frame indices, bboxes) of the successfully tracked frames per droplet.
+        """
+        video = self.open_video(video_path)
+        if not video.isOpened():
+            raise ValueError(f"Could not open video {video_path}")
+
+        try:
+            ret, frame = video.read()
+            if not ret:
+                raise ValueError(f"Could not read the first frame of {video_path}")
+
+            display_size = (self.display_width, self.display_height)
+            if not self.crop:
+                frame = cv2.resize(frame, display_size)
+            trackers = []
+            for bbox in bboxes:
+                if self.crop:
+                    native_size = (frame.shape[1], frame.shape[0])
+                    tracker = CroppedTracker(lambda: create_tracker(self.tracker_name), native_size, display_size)
+                else:
+                    tracker = create_tracker(self.tracker_name)
+                tracker.init(frame, tuple(int(v) for v in bbox))
+                trackers.append(tracker)
+
+            frames = [[] for _ in trackers]
+            tracked = [[] for _ in trackers]
+            # Last (frame, y-center) samples of each droplet, for the adaptive stride
+            history = [deque([(0, bbox[1] + bbox[3] / 2)], maxlen=3) for bbox in bboxes]
+            index = 0
+            step = self.stride
+            while True:
+                # Skipped frames are only grabbed, which skips their color conversion, resize and tracking
+                for _ in range(step - 1):
+                    if not video.grab():
+                        break
+                    index += 1
+                ret, frame = video.read()
+                if not ret:
+                    break
+                index += 1
+                if not self.crop:
+                    frame = cv2.resize(frame, display_size)
+                next_step = self.max_stride
+                for tracker, droplet_frames, droplet_bboxes, samples in zip(trackers, frames, tracked, history):
+                    ret, tracked_bbox = tracker.update(frame)
+                    if ret:
+                        droplet_frames.append(index)
+                        droplet_bboxes.append(tracked_bbox)
+                        samples.append((index, tracked_bbox[1] + tracked_bbox[3] / 2))
+                        next_step = min(next_step, self.next_stride(step, samples))
+                    else:
+                        next_step = self.stride
+                step = next_step
+        finally:
+            video.release()
+
+        return [
+            (np.array(droplet_frames, dtype=int), np.array(droplet_bboxes, dtype=float).reshape(-1, 4))
+            for droplet_frames, droplet_bboxes in zip(frames, tracked)
+        ]
+
+    def next_stride(self, step, samples):
+        """Stride after a droplet's latest samples: doubled while its velocity is steady, else the base stride."""
+        if self.max_stride == self.stride or len(samples) < 3:
+            return self.stride
+        (f0, y0), (f1, y1), (f2, y2) = samples
+        v0 = (y1 - y0) / (f1 - f0)
+        v1 = (y2 - y1) / (f2 - f1)
+        if v0 * v1 > 0 and abs(v1 - v0) <= self.steady_tolerance * max(abs(v0), abs(v1)):
+            return min(step * 2, self.max_stride)
+        return self.stride
+
+    def track_cached(self, video_path, bbox):
+        """Like track(), but load the result of an earlier run with the same video, ROI and tracker if there is one."""
+        return self.track_cached_many(video_path, [bbox])[0]
+
+    def track_cached_many(self, video_path, bboxes):
+        """Like track_many(), but only the droplets missing from the track cache are tracked."""
+        if not self.use_cache:
+            return self.track_many(video_path, bboxes)
+        cache = TrackCache(video_path, output_dir_for(video_path))
+        results = [cache.load(0, bbox, self.tracker_name, self.crop, self.sampling(), self.proxy_mode()) for bbox in bboxes]
+        missing = [position for position, result in enumerate(results) if result is None]
+        if missing:
+            tracked = self.track_many(video_path, [bboxes[position] for position in missing])
+            for position, (frames, droplet_bboxes) in zip(missing, tracked):
+                cache.save(0, bboxes[position], self.tracker_name, frames, droplet_bboxes, self.crop,
+                           self.sampling(), self.proxy_mode())
+                results[position] = (frames, droplet_bboxes)
+        return results
+
+    def find_velocities(self, y, frames=None):
+        """Return (vu, vd) in m/s for a y-center trajectory in display pixels."""
+        return self.charge_calculator.velocities(*self.find_pixel_slopes(y, frames))
+
+    def find_pixel_slopes(self, y, frames=None):
+        """Return the median slopes behind (vu, vd), in pixels per frame, for a y-center trajectory.
+
+        frames are the frame indices of the samples. Where they are not consecutive (strided
+        tracking, frames the tracker lost) y is interpolated onto every frame in between, so
+        the peak search keeps working in frames. When most frames were skipped, the slopes
+        are fitted to the samples inside each leg rather than taken between the turning points.
+        """
+        if frames is None:
+            t = np.arange(len(y))
+        else:
+            frames = np.asarray(frames)
+            samples = np.asarray(y)
+            t = np.arange(frames[0], frames[-1] + 1)
+            y = np.interp(t, frames, samples)
+        peaks, troughs = find_peaks_and_troughs(y)
+        if frames is not None and len(frames) > 1 and np.median(np.diff(frames)) > 1:
+            turning_points = np.sort(np.concatenate([t[peaks], t[troughs]]))
+            return find_leg_pixel_slopes(frames, samples, turning_points)
+        peak_points = [(t[index], y[index]) for index in peaks]
+        trough_points = [(t[index], y[index]) for index in troughs]
+        return find_pixel_slopes(peak_points, trough_points)
+
+    def find_charge_intervals(self, y, frames=None, center=None):
+        """Return the 95% bootstrap intervals ((charge_low, charge_high), (integer_low, integer_high)) for a trajectory.
+
+        center is the (vu, vd) reported for it, which the intervals are placed around.
+        """
+        t = np.arange(len(y)) if frames is None else np.asarray(frames)
+        y = np.asarray(y)
+        # Turning points are searched on every frame, as in find_velocities
+        every_frame = np.arange(t[0], t[-1] + 1)
+        peaks, troughs = find_peaks_and_troughs(np.interp(every_frame, t, y))
+        turning_points = np.sort(np.concatenate([every_frame[peaks], every_frame[troughs]]))
+        vu, vd = bootstrap_velocities(t, y, turning_points, self.bootstrap, center,
+                                      fps=self.charge_calculator.fps, calibration=self.charge_calculator.pixels_mm)
+        return self.charge_calculator.find_charge_intervals(vu, vd)
+
+    def analyze(self, video_path, bbox):
+        """Analyze one droplet of a video and return a results row; failures are reported in the 'error' field."""
+        return self.analyze_many(video_path, [bbox])[0]
+
+    def analyze_many(self, video_path, bboxes):
+        """Analyze several droplets of a video from one decoding pass and return a results row per droplet."""
+        rows = []
+        for droplet, (x, y, w, h) in enumerate(bboxes):
+            rows.append({
+                'video': os.path.basename(video_path),
+                'droplet': droplet,
+                'x': x, 'y': y, 'w': w, 'h': h,
+                'tracker': self.tracker_name,
+                'crop': self.crop,
+                'frames_tracked': 0,
+                'slope_up': None, 'slope_down': None,
+                'vu': None, 'vd': None,
+                'charge': None, 'integer': None,
+                'charge_low': None, 'charge_high': None, 'integer_low': None, 'integer_high': None,
+                'error': '',
+            })
+
+        try:
+            tracked = self.track_cached_many(video_path, bboxes)
+        except (ValueError, cv2.error) as e:
+            for row in rows:
+                row['error'] = str(e).strip()
+            return rows
+
+        for row, (droplet_frames, droplet_bboxes) in zip(rows, tracked):
+            try:
+                y_centers = droplet_bboxes[:, 1] + droplet_bboxes[:, 3] / 2
+                row['frames_tracked'] = len(y_centers)
+                if len(y_centers) == 0:
+                    raise ValueError("Droplet was not tracked in any frame")
+                slope_up, slope_down = self.find_pixel_slopes(y_centers, droplet_frames)
+                # Kept so the charges can be recomputed under another calibration without tracking again
+                row['slope_up'], row['slope_down'] = abs(float(slope_up)), abs(float(slope_down))
+                vu, vd = self.charge_calculator.velocities(slope_up, slope_down)
+                row['vu'], row['vd'] = vu, vd
+                charge, integer = self.charge_calculator.find_charge_and_integer(vu, vd)
+                row['charge'], row['integer'] = charge, integer
+                if self.bootstrap:
+                    try:
+                        (row['charge_low'], row['charge_high']), (row['integer_low'], row['integer_high']) = \
+                            self.find_charge_intervals(y_centers, droplet_frames, (vu, vd))
+                    except ValueError:
+                        pass  # Legs too short to bootstrap; the charge itself still stands
+            except (ValueError, cv2.error) as e:
+                row['error'] = str(e).strip()
+
+        return rows
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from util import extract_video_properties
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov')
+
+class VideoCatalog:
+    """Metadata and thumbnails of the videos in a directory, probed on background threads.
+
+    scan() returns at once. A scan thread lists the directory and a thread pool opens every
+    video to read its frame count, size, fps, duration and codec and to save a thumbnail of
+    its first frame, so a slow network share never holds up the Tk event loop. The GUI
+    drains get_results() as entries arrive: first every video name with info None, then the
+    info of each video as its probe finishes, in any order.
+
+    Probes are cached in cache_dir as one JSON file and one PNG per video, named after a hash
+    of its path, modification time and size, so scanning a directory again only lists it and
+    reads the cache, and an edited or replaced video is probed again.
+    """
+
+    def __init__(self, cache_dir=os.path.join('output', 'catalog'), workers=8, thumbnail_size=(96, 96)):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.thumbnail_size = thumbnail_size
+        self.results = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.finished = False
+        self.count = 0  # Videos found by the current scan
+
+    def scan(self, directory):
+        """Start listing and probing directory in the background, stopping any scan still running."""
+        self.stop()
+        self.results = queue.Queue()
+        self.stop_event = threading.Event()
+        self.finished = False
+        self.count = 0
+        self.thread = threading.Thread(target=self._scan, args=(directory, self.results, self.stop_event), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the current scan without waiting for it; probes already running finish, queued ones are dropped.
+
+        The stopped scan keeps its own queue, so whatever it still finds never reaches get_results().
+        """
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread = None
+            self.results = queue.Queue()
+            self.finished = True
+
+    def get_results(self):
+        """Return every (name, info) found since the last call, in the order they arrived.
+
+        info is None when the video has only been listed, else the dict of probe().
+        """
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def _scan(self, directory, results, stop_event):
+        try:
+            with os.scandir(directory) as entries:
+                videos = sorted((entry.name, entry.stat()) for entry in entries
+                                if entry.name.lower().endswith(VIDEO_EXTENSIONS) and entry.is_file())
+        except OSError:
+            videos = []
+        # A scan that was stopped has had its queue replaced, and leaves the state of the next one alone
+        if results is self.results:
+            self.count = len(videos)
+        for name, _ in videos:
+            results.put((name, None))
+
+        # Cached videos are answered before any probe starts, so a directory seen before fills in at once
+        missing = []
+        for name, stat in videos:
+            info = self._load(self._key(os.path.join(directory, name), stat))
+            if info is not None:
+                results.put((name, info))
+            else:
+                missing.append((name, stat))
+
+        # Probes still queued when the scan is stopped return without opening their video
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for name, stat in missing:
+                pool.submit(self._probe_cached, directory, name, stat, results, stop_event)
+        if results is self.results:
+            self.finished = True
+
+    def _probe_cached(self, directory, name, stat, results, stop_event):
+        if stop_event.is_set():
+            return
+        path = os.path.join(directory, name)
+        key = self._key(path, stat)
+        try:
+            info = self.probe(path, os.path.join(self.cache_dir, f"{key}.png"))
+            if info['error'] is None:
+                self._save(key, info)  # Videos that could not be read are probed again on the next scan
+        except (OSError, cv2.error) as e:
+            info = {'frames': 0, 'width': 0, 'height': 0, 'fps': None, 'duration': None, 'codec': '',
+                    'thumbnail': None, 'error': str(e).strip()}
+        results.put((name, info))
+
+    def _key(self, path, stat):
+        identity = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, tuple(self.thumbnail_size))
+        return hashlib.sha1(repr(identity).encode()).hexdigest()[:16]
+
+    def _load(self, key):
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.json")) as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if info['thumbnail'] is not None and not os.path.exists(info['thumbnail']):
+            return None  # The thumbnail was cleared; probe again to make a new one
+        return info
+
+    def _save(self, key, info):
+        # Written under a temporary name first, so another scan never reads half an entry
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(info, f)
+        os.replace(temporary, path)
+
+    def probe(self, path, thumbnail_path=None):
+        """Open a video and return its metadata as a dict, saving a thumbnail of its first frame to thumbnail_path.
+
+        The dict has 'frames', 'width', 'height', 'fps', 'duration' in seconds, the FourCC
+        'codec', the 'thumbnail' path (None without one) and 'error', None unless the video
+        could not be read.
+        """
+        info = {'frames': 0, 'width': 0, 'height': 0, 'fps': None, 'duration': None, 'codec': '',
+                'thumbnail': None, 'error': None}
+        video = cv2.VideoCapture(path)
+        try:
+            if not video.isOpened():
+                info['error'] = "Could not open the video"
+                return info
+            info['frames'], info['width'], info['height'] = extract_video_properties(video)
+            fps = video.get(cv2.CAP_PROP_FPS)
+            if fps > 0:
+                info['fps'] = fps
+                info['duration'] = info['frames'] / fps
+            fourcc = int(video.get(cv2.CAP_PROP_FOURCC))
+            info['codec'] = ''.join(chr((fourcc >> shift) & 0xFF) for shift in (0, 8, 16, 24)).strip('\x00 ')
+
+            ret, frame = video.read()
+            if not ret:
+                info['error'] = "Could not read a frame"
+            elif thumbnail_path is not None:
+                # Shrunk to fit the thumbnail size, keeping the aspect ratio
+                scale = min(self.thumbnail_size[0] / frame.shape[1], self.thumbnail_size[1] / frame.shape[0])
+                size = (max(1, round(frame.shape[1] * scale)), max(1, round(frame.shape[0] * scale)))
+                os.makedirs(os.path.dirname(thumbnail_path) or '.', exist_ok=True)
+                if cv2.imwrite(thumbnail_path, cv2.resize(frame, size, interpolation=cv2.INTER_AREA)):
+                    info['thumbnail'] = thumbnail_path
+        finally:
+            video.release()
+        return info
@@ -1,2 +1,21 @@
 # from .{File} import {Class}
-from .ChargeCalculator import ChargeCalculator
\ No newline at end of file
+from .BlitManager import BlitManager
+from .ChargeCalculator import ChargeCalculator, ELEMENTARY_CHARGE, charges_for
+from .CroppedTracker import CroppedTracker
+from .Droplet import Droplet
+from .DropletDetector import DropletDetector
+from .ElementaryChargeEstimator import ElementaryChargeEstimator
+from .ExtremumDetector import ExtremumDetector
+from .FrameCache import FrameCache
+from .FrameIndex import FrameIndex
+from .FrameProxy import FrameProxy, ProxyCapture
+from .ImageCache import ImageCache
+from .ResultsStore import ResultsStore
+from .StageTimer import StageTimer
+from .TemplateTracker import TemplateTracker
+from .TrackCache import TrackCache
+from .TrackerRegistry import DEFAULT_TRACKER, TRACKERS, create_tracker
+from .TrackingPipeline import TrackingPipeline
+from .Trajectory import TRAJECTORY_DTYPE, Trajectory
+from .VideoAnalyzer import VideoAnalyzer
+from .VideoCatalog import VideoCatalog
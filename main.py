@@ -3,12 +3,13 @@ from tkinter import messagebox, filedialog
 from PIL import Image, ImageTk
 import cv2
 import os
-from util import extract_video_properties, find_slopes
+import threading
+import time
+from util import extract_video_properties, output_dir_for
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 import numpy as np
-from scipy.signal import find_peaks
-from components import ChargeCalculator
+from components import BlitManager, ChargeCalculator, CroppedTracker, DEFAULT_TRACKER, Droplet, DropletDetector, ElementaryChargeEstimator, FrameCache, FrameIndex, FrameProxy, ImageCache, ResultsStore, StageTimer, TRACKERS, TrackCache, TrackingPipeline, VideoCatalog, create_tracker
 from tkinter.ttk import Progressbar
 
 class MillikanExperimentApp:
@@ -21,31 +22,77 @@ class MillikanExperimentApp:
 
         # Video and Tracker Variables
         self.video = None
-        self.tracker = cv2.TrackerCSRT_create()
+        self.tracker_name = tk.StringVar(value=DEFAULT_TRACKER)
+        self.crop_tracking = tk.BooleanVar(value=False)
+        self.tracking_native = False  # Whether the droplets' trackers work on native-resolution crops
+        self.use_proxy = tk.BooleanVar(value=False)
+        self.frame_proxy = None  # Memory-mapped display frames of the video, read instead of decoding
+        self.playback_mode = tk.StringVar(value='Normal')
+        self.display_rate = 15  # Display refreshes per second in Fast mode
+        self.display_updated = 0.0
+        self.charts_stale = False  # Batches were analyzed without drawing the charts
+        self.pipeline = None
+        self.frame_cache = None
+        self.frame_cache_mb = 256  # Memory budget for decoded display frames
+        self.frame_index_thread = None  # Builds the keyframe index of the open video in the background
+        self.frame_proxy_thread = None  # Decodes the frame proxy of the selected video in the background
+        self.track_cache = None  # Trajectories of earlier runs on this video, stored in its output directory
         self.current_frame = 0
         self.total_frames = 0
+        self.fps = 30.0
+        self.trajectory_length = 0  # Frames a droplet's trajectory has room for
         self.frame_width = 0
         self.frame_height = 0
         self.display_width = 512 
         self.display_height = 512
 
         self.roi_selection = False
-        self.bbox = None
-        self.bbox_history = {}
+        # Droplets tracked together against the same decoded frames; Shift-drag adds one
+        self.droplets = []
+        # (box color, chart line color) per droplet, in the order they are added
+        self.droplet_colors = [
+            ('blue', 'black'), ('red', 'red'), ('green', 'green'),
+            ('orange', 'orange'), ('magenta', 'magenta'), ('cyan', 'cyan'),
+        ]
+        self.droplet_detector = DropletDetector()
         self.start_x = self.start_y = self.end_x = self.end_y = 0
 
         self.paused = True
         self.video_path = None
         self.output_path = None
         self.canvas_image = None
+        # Display buffers reused for every frame: the RGBA pixels, a PIL image over them and the Tk photo
+        self.rgba_buffer = None
+        self.rgba_image = None
+        self.photo_image = None
         self.video_directory = "input" 
-
-        self.y_centers = []
-        self.charge_integer_pairs = []
+        # Videos of the directory, listed and probed on background threads; the Listbox fills in as they arrive
+        self.video_catalog = VideoCatalog()
+        self.video_files = []  # File names in Listbox order
+        self.video_rows = {}  # File name -> Listbox index
+        self.video_info = {}  # File name -> metadata of VideoCatalog.probe, once known
+        self.video_scan_job = None
+        self.thumbnail_image = None
+
+        self.charge_integer_pairs = []  # (charge, integer, frame the estimate was made at, droplet) per batch
+        # Final results of every droplet tracked to the end of its video, kept across sessions
+        self.results_store = None  # Opened on first use
+        self.stored_droplets = set()  # Droplets of this session whose result is in the store
+        self.show_all_results = tk.BooleanVar(value=False)
+        self.stored_charges = None  # Charges of the store, read once per change for the estimate of e
+        self.charge_estimator = ElementaryChargeEstimator()
+        # 95% intervals of q and q/e bootstrapped from this many resamples at every batch
+        self.show_uncertainty = tk.BooleanVar(value=False)
+        self.bootstrap_resamples = 1000
+
+        # Per-stage timings of playback, shown on the video canvas when the HUD is on
+        self.show_hud = tk.BooleanVar(value=False)
+        self.stage_timer = StageTimer(enabled=False)
+        self.hud_interval = 0.5  # Seconds between HUD refreshes
+        self.hud_updated = 0.0
 
         # Batch size for updates
         self.batch_size = 50
-        self.batch_y_centers = []
 
         # GUI Layout
 
@@ -62,6 +109,11 @@ class MillikanExperimentApp:
 
         self.video_listbox = tk.Listbox(self.left_frame, width=30)
         self.video_listbox.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
+        self.video_listbox.bind("<<ListboxSelect>>", self.show_video_info)
+
+        # Thumbnail and details of the selected video
+        self.video_info_label = tk.Label(self.left_frame, bg="lightgray", compound=tk.TOP, justify=tk.LEFT)
+        self.video_info_label.pack(pady=5)
 
         self.load_videos_button = tk.Button(self.left_frame, text="Load Videos", command=self.load_videos)
         self.load_videos_button.pack(pady=5)
@@ -69,6 +121,42 @@ class MillikanExperimentApp:
         self.select_video_button = tk.Button(self.left_frame, text="Select Video", command=self.select_video)
         self.select_video_button.pack(pady=5)
 
+        # Seeds the ROIs from the droplets that stay in view over the next frames
+        self.detect_button = tk.Button(self.left_frame, text="Detect Droplets", command=self.detect_droplets, state=tk.DISABLED)
+        self.detect_button.pack(pady=5)
+
+        # Tracker backend, applied the next time an ROI is drawn
+        tk.Label(self.left_frame, text="Tracker:", bg="lightgray").pack(pady=(10, 0))
+        self.tracker_menu = tk.OptionMenu(self.left_frame, self.tracker_name, *TRACKERS)
+        self.tracker_menu.pack(pady=5)
+
+        # Normal shows the latest frame on every tick, Fast tracks flat out and refreshes the display,
+        # progress bar and charts display_rate times a second, Real time plays at the video's frame rate
+        tk.Label(self.left_frame, text="Playback:", bg="lightgray").pack(pady=(10, 0))
+        self.playback_menu = tk.OptionMenu(self.left_frame, self.playback_mode, 'Normal', 'Fast', 'Real time')
+        self.playback_menu.pack(pady=5)
+        self.crop_checkbox = tk.Checkbutton(
+            self.left_frame, text="Track at native resolution", variable=self.crop_tracking, bg="lightgray"
+        )
+        self.crop_checkbox.pack(pady=5)
+        self.proxy_checkbox = tk.Checkbutton(
+            self.left_frame, text="Use frame proxy", variable=self.use_proxy, bg="lightgray"
+        )
+        self.proxy_checkbox.pack(pady=5)
+        self.hud_checkbox = tk.Checkbutton(
+            self.left_frame, text="Show performance HUD", variable=self.show_hud, bg="lightgray", command=self.toggle_hud
+        )
+        self.hud_checkbox.pack(pady=5)
+        self.all_results_checkbox = tk.Checkbutton(
+            self.left_frame, text="Histogram of all sessions", variable=self.show_all_results, bg="lightgray",
+            command=self.refresh_charts
+        )
+        self.all_results_checkbox.pack(pady=5)
+        self.uncertainty_checkbox = tk.Checkbutton(
+            self.left_frame, text="Show 95% intervals", variable=self.show_uncertainty, bg="lightgray"
+        )
+        self.uncertainty_checkbox.pack(pady=5)
+
         # Right Frame for the 2x2 grid
         self.right_frame = tk.Frame(root)
         self.right_frame.pack(side=tk.TOP, fill=tk.BOTH)
@@ -144,19 +232,26 @@ class MillikanExperimentApp:
 
         
         ###########################
+        # Images and equations are rendered once into media/cache and loaded as plain PhotoImages
+        self.image_cache = ImageCache()
         # Add visual element (Image)
         self.add_visual_element()
         self.add_visual_element2()
         # Add eq 1
-        self.add_equation_widget()
+        self.equation_widget = self.add_equation_widget(
+            r"$6 \pi \eta r v_t = \frac{4}{3} \pi r^3 (\rho_{\text{oil}} - \rho_{\text{air}}) \cdot g$", (3, 1), (130, 80))
         # Add eq 2 
-        self.add_equation_widget2()
+        self.equation_widget2 = self.add_equation_widget(
+            r"$r = \sqrt{\frac{9 \eta v_t}{2 g (\rho_{\text{oil}} - \rho_{\text{air}})}}$", (3, 1), (330, 80))
         # Add eq 3
-        self.add_equation_widget3()
+        self.equation_widget3 = self.add_equation_widget(
+            r"$q \cdot E = 6 \pi \eta r v_u + \frac{4}{3} \pi r^3 (\rho_{\text{oil}} - \rho_{\text{air}}) \cdot g$", (5, 1), (80, 80))
         # Add eq 4
-        self.add_equation_widget4()
+        self.equation_widget4 = self.add_equation_widget(
+            r"$q \cdot \frac{V}{d} = 6 \pi \eta r v_u + \frac{4}{3} \pi r^3 (\rho_{\text{oil}} - \rho_{\text{air}}) \cdot g$", (5, 1), (250, 200))
         # Add eq 5
-        self.add_equation_widget5()
+        self.equation_widget5 = self.add_equation_widget(
+            r"$q = \frac{6 \pi \eta r v_u + \frac{4}{3} \pi r^3 (\rho_{\text{oil}} - \rho_{\text{air}}) \cdot g}{\left(\frac{V}{d}\right)}$", (3, 1), (380, 50))
         ###########################
 
         # Back Button (bottom-left of instructions grid)
@@ -279,6 +374,11 @@ class MillikanExperimentApp:
             side=tk.RIGHT, padx=5, pady=5, fill=tk.BOTH, expand=False 
         )
 
+        # Create the live chart artists once; batches only update their data
+        self.setup_chart()
+        self.setup_gauge()
+        self.setup_integer_chart()
+
         # Configure row and column weights for dynamic resizing
         self.right_frame.grid_rowconfigure(0, weight=1)
         self.right_frame.grid_rowconfigure(1, weight=1)
@@ -291,10 +391,57 @@ class MillikanExperimentApp:
         self.video_container.grid_columnconfigure(0, weight=1)  # Video canvas
         self.video_container.grid_columnconfigure(1, weight=0)  # Controls frame
 
+    def build_frame_index(self):
+        """Load or build the keyframe index of the open video on a background thread.
+
+        Building reads every packet of the video, which takes seconds for a long video on a
+        slow disk, so the first frame is shown straight away and the index is handed to the
+        frame cache once it is ready.
+        """
+        video_path, output_path = self.video_path, self.output_path
+        result = {}
+
+        def build():
+            # Cached next to the other outputs of this video
+            try:
+                result['index'] = FrameIndex.load_or_build(video_path, output_path)
+            except (OSError, ValueError, cv2.error):
+                pass  # Seeking stays on CAP_PROP_POS_FRAMES
+
+        thread = threading.Thread(target=build, daemon=True)
+        self.frame_index_thread = thread
+        thread.start()
+        self.root.after(100, lambda: self.install_frame_index(thread, result))
+
+    def install_frame_index(self, thread, result):
+        """Hand the keyframe index to the frame cache once its thread is done."""
+        if thread is not self.frame_index_thread:
+            return  # Another video was opened meanwhile
+        if thread.is_alive():
+            self.root.after(100, lambda: self.install_frame_index(thread, result))
+            return
+        self.frame_index_thread = None
+        frame_index = result.get('index')
+        if frame_index is None or self.frame_cache is None:
+            return
+        self.frame_cache.frame_index = frame_index
+        # The index counted the frames while building, which is exact where the container's frame count is not
+        self.trajectory_length = max(self.total_frames, frame_index.total_frames)
+        for droplet in self.droplets:
+            droplet.trajectory.resize(self.trajectory_length)
+
     def load_videos(self):
         """Load video files from a user-selected directory into the Listbox."""
         self.highlight_button(self.load_videos_button)
+        if self.video_scan_job is not None:
+            self.root.after_cancel(self.video_scan_job)
+            self.video_scan_job = None
+        self.video_catalog.stop()
         self.video_listbox.delete(0, tk.END)
+        self.video_files = []
+        self.video_rows = {}
+        self.video_info = {}
+        self.show_video_info()
 
         # Open a dialog for the user to select a folder
         selected_directory = filedialog.askdirectory(title="Select Video Directory")
@@ -303,14 +450,66 @@ class MillikanExperimentApp:
 
         self.video_directory = selected_directory
 
-        # List videos in the selected directory
-        videos = [f for f in os.listdir(self.video_directory) if f.lower().endswith(('.mp4', '.avi', '.mov'))]
-        if not videos:
-            messagebox.showinfo("No Videos Found", "No video files were found in the selected directory.")
+        # Listing and probing run in the background, so a slow share never freezes the window
+        self.video_catalog.scan(self.video_directory)
+        self.poll_video_scan()
+
+    def poll_video_scan(self):
+        """Add the videos and metadata the background scan found since the last poll to the Listbox."""
+        # Read before draining, so nothing that arrives in between is left behind
+        finished = self.video_catalog.finished
+        selected = self.video_listbox.curselection()
+        for name, info in self.video_catalog.get_results():
+            if info is None:
+                self.video_rows[name] = len(self.video_files)
+                self.video_files.append(name)
+                self.video_listbox.insert(tk.END, name)
+                continue
+            self.video_info[name] = info
+            index = self.video_rows[name]
+            self.video_listbox.delete(index)
+            self.video_listbox.insert(index, self.video_label(name, info))
+            if index in selected:
+                self.video_listbox.selection_set(index)
+                self.show_video_info()
+
+        if not finished:
+            self.video_scan_job = self.root.after(25, self.poll_video_scan)
             return
+        self.video_scan_job = None
+        if not self.video_files:
+            messagebox.showinfo("No Videos Found", "No video files were found in the selected directory.")
 
-        for video in videos:
-            self.video_listbox.insert(tk.END, video)
+    @staticmethod
+    def video_label(name, info):
+        """Listbox text of a probed video: its name, duration and frame rate."""
+        if info['error']:
+            return f"{name}  (unreadable)"
+        if info['duration'] is None:
+            return name
+        minutes, seconds = divmod(int(round(info['duration'])), 60)
+        return f"{name}  {minutes}:{seconds:02d}  {info['fps']:.0f} fps"
+
+    def show_video_info(self, event=None):
+        """Show the thumbnail and details of the video selected in the Listbox."""
+        selected = self.video_listbox.curselection()
+        info = self.video_info.get(self.video_files[selected[0]]) if selected else None
+        self.thumbnail_image = None
+        if not selected:
+            self.video_info_label.config(image='', text='')
+        elif info is None:
+            self.video_info_label.config(image='', text="Reading video...")
+        elif info['error']:
+            self.video_info_label.config(image='', text=info['error'])
+        else:
+            if info['thumbnail'] is not None:
+                # Tk reads the cached PNG itself
+                self.thumbnail_image = tk.PhotoImage(file=info['thumbnail'])
+            fps = f"{info['fps']:.2f} fps" if info['fps'] else "unknown fps"
+            self.video_info_label.config(
+                image=self.thumbnail_image or '',
+                text=f"{info['width']}x{info['height']}  {info['codec']}\n{info['frames']} frames at {fps}",
+            )
 
     def select_video(self):
         """Handle video selection from the Listbox."""
@@ -323,36 +522,107 @@ class MillikanExperimentApp:
         # Reset states
         self.reset_states()
 
-        selected_video = self.video_listbox.get(selected_index)
+        selected_video = self.video_files[selected_index[0]]
         self.video_path = os.path.join(self.video_directory, selected_video)
 
+        # Prepare output directory
+        self.output_path = output_dir_for(self.video_path)
+        os.makedirs(self.output_path, exist_ok=True)
+
         # Set up video properties
-        self.video = cv2.VideoCapture(self.video_path)
+        if self.use_proxy.get():
+            self.build_frame_proxy()
+        else:
+            self.open_video(cv2.VideoCapture(self.video_path))
+
+    def set_video_controls(self, state):
+        """Enable (tk.NORMAL) or disable (tk.DISABLED) the buttons that need an open video."""
+        for button in (self.detect_button, self.play_button, self.pause_button, self.forward_button,
+                       self.backward_button, self.fast_forward_button, self.fast_backward_button):
+            button.config(state=state)
+
+    def build_frame_proxy(self):
+        """Load or build the frame proxy of the selected video on a background thread, then open it.
+
+        The proxy is decoded once into output/<video>/ on first use, which takes as long as
+        decoding the whole video, so the progress bar follows the decode and the window stays
+        responsive meanwhile. Afterwards every frame is a slice of the mapping.
+        """
+        video_path, output_path = self.video_path, self.output_path
+        size = (self.display_width, self.display_height)
+        result = {'progress': 0}
+
+        def progress(count, capacity):
+            result['progress'] = 100 * count / max(1, capacity)
+
+        def build():
+            try:
+                result['proxy'] = FrameProxy.load_or_build(video_path, output_path, size, progress=progress)
+            except (OSError, ValueError, cv2.error) as e:
+                result['error'] = str(e).strip()
+
+        # Nothing can be played or detected until the proxy is open
+        self.set_video_controls(tk.DISABLED)
+        thread = threading.Thread(target=build, daemon=True)
+        self.frame_proxy_thread = thread
+        thread.start()
+        self.root.after(100, lambda: self.install_frame_proxy(thread, result))
+
+    def install_frame_proxy(self, thread, result):
+        """Open the video through its frame proxy once its thread is done, showing progress until then."""
+        if thread is not self.frame_proxy_thread:
+            return  # Another video was opened meanwhile
+        if thread.is_alive():
+            self.progress_bar['value'] = result['progress']
+            self.root.after(100, lambda: self.install_frame_proxy(thread, result))
+            return
+        self.frame_proxy_thread = None
+        self.progress_bar['value'] = 0
+        if 'error' in result:
+            messagebox.showerror("Error", result['error'])
+            return
+        self.frame_proxy = result['proxy']
+        self.open_video(self.frame_proxy.capture())
+
+    def open_video(self, video):
+        """Show the first frame of the selected video, read through video, and enable the controls."""
+        self.video = video
         if not self.video.isOpened():
             messagebox.showerror("Error", f"Could not open video {self.video_path}")
             return
 
         # Extract video properties
         self.total_frames, self.frame_width, self.frame_height = extract_video_properties(self.video)
-
-        # Prepare output directory
-        base_name = os.path.basename(self.video_path).split('.')[0]
-        self.output_path = os.path.join('output', base_name)
-        os.makedirs(self.output_path, exist_ok=True)
+        self.fps = self.video.get(cv2.CAP_PROP_FPS) or 30.0
+        self.ax.set_xlim(0, max(1, self.total_frames))
+        self.chart_blitter.redraw()
+
+        if self.frame_proxy is not None:
+            # Seeks into the proxy are exact and any frame is one slice away, so nothing is read ahead
+            self.frame_cache = FrameCache(
+                self.video, (self.display_width, self.display_height),
+                budget_mb=self.frame_cache_mb, read_ahead=0, read_behind=0,
+            )
+            # The proxy holds exactly the frames that decoded
+            self.trajectory_length = self.total_frames
+        else:
+            # Seeks use CAP_PROP_POS_FRAMES until the keyframe index is ready
+            self.frame_cache = FrameCache(
+                self.video, (self.display_width, self.display_height), budget_mb=self.frame_cache_mb,
+            )
+            self.trajectory_length = self.total_frames
+            self.build_frame_index()
+        self.track_cache = TrackCache(self.video_path, self.output_path)
 
         # Enable controls
-        self.play_button.config(state=tk.NORMAL)
-        self.pause_button.config(state=tk.NORMAL)
-        self.forward_button.config(state=tk.NORMAL)
-        self.backward_button.config(state=tk.NORMAL)
-        self.fast_forward_button.config(state=tk.NORMAL)
-        self.fast_backward_button.config(state=tk.NORMAL)
+        self.set_video_controls(tk.NORMAL)
 
         # Read the first frame
         ret, self.frame = self.video.read()
         if ret:
             self.current_frame = 0
             self.frame = cv2.resize(self.frame, (self.display_width, self.display_height))
+            self.frame_cache.put(self.current_frame, self.frame)
             self.display_frame(self.frame)
 
             if self.slider is not None:
@@ -385,23 +655,15 @@ class MillikanExperimentApp:
         # Show/hide equation
         if self.current_page == 1: 
             # Example: On page 1, display the equation
-            self.set_equation_text(r"$6 \pi \eta r v_t = \frac{4}{3} \pi r^3 (\rho_{\text{oil}} - \rho_{\text{air}}) \cdot g$")
             self.equation_widget.grid()
-            
-            self.set_equation_text2(r"$r = \sqrt{\frac{9 \eta v_t}{2 g (\rho_{\text{oil}} - \rho_{\text{air}})}}$") 
             self.equation_widget2.grid()
         else:
             self.equation_widget.grid_remove()
             self.equation_widget2.grid_remove()
         
         if self.current_page == 2:
-            self.set_equation_text3(r"$q \cdot E = 6 \pi \eta r v_u + \frac{4}{3} \pi r^3 (\rho_{\text{oil}} - \rho_{\text{air}}) \cdot g$")
             self.equation_widget3.grid()
-            
-            self.set_equation_text4(r"$q \cdot \frac{V}{d} = 6 \pi \eta r v_u + \frac{4}{3} \pi r^3 (\rho_{\text{oil}} - \rho_{\text{air}}) \cdot g$")
             self.equation_widget4.grid()
-            
-            self.set_equation_text5(r"$q = \frac{6 \pi \eta r v_u + \frac{4}{3} \pi r^3 (\rho_{\text{oil}} - \rho_{\text{air}}) \cdot g}{\left(\frac{V}{d}\right)}$")
             self.equation_widget5.grid()
             
         else:
@@ -439,8 +701,8 @@ class MillikanExperimentApp:
     def add_visual_element(self):
         """Add an image to the instructions frame."""
         image_path = os.path.join('media', 'millikanApparatus.png')
-        image = Image.open(image_path).resize((400, 300), Image.Resampling.LANCZOS)  # Resize image
-        self.image_tk = ImageTk.PhotoImage(image)  # Keep a reference to avoid garbage collection
+        # Keep a reference to avoid garbage collection
+        self.image_tk = tk.PhotoImage(file=self.image_cache.resized(image_path, (400, 300)))
 
         # Create a label for the image
         self.image_label = tk.Label(self.instructions_frame, image=self.image_tk, bg="white")
@@ -449,8 +711,8 @@ class MillikanExperimentApp:
     def add_visual_element2(self):
         """Add a second image to the instructions frame."""
         image_path = os.path.join('media', 'Charge_vs_Integer_Multiple.png')
-        image2 = Image.open(image_path).resize((500, 400), Image.Resampling.LANCZOS)  # Resize image
-        self.image_tk2 = ImageTk.PhotoImage(image2)  # Keep a separate reference to avoid garbage collection
+        # Keep a separate reference to avoid garbage collection
+        self.image_tk2 = tk.PhotoImage(file=self.image_cache.resized(image_path, (500, 400)))
 
         # Create a label for the second image
         self.image_label2 = tk.Label(self.instructions_frame, image=self.image_tk2, bg="white")
@@ -458,178 +720,45 @@ class MillikanExperimentApp:
         
         
 
-    def add_equation_widget(self):
-        """Create the matplotlib figure to display a LaTeX equation, then hide it initially."""
-        self.equation_figure = Figure(figsize=(3, 1), dpi=100) #(Width, Height)
-        self.equation_ax = self.equation_figure.add_subplot(111)
-        self.equation_ax.axis('off')  # Hide axes for a cleaner look
+    def add_equation_widget(self, latex_equation, figsize, pady):
+        """Show a pre-rendered LaTeX equation in the instructions frame, hidden initially."""
+        image = tk.PhotoImage(file=self.image_cache.equation(latex_equation, figsize))
+        widget = tk.Label(self.instructions_frame, image=image, bg="white", borderwidth=0)
+        widget.image = image  # Keep a reference to avoid garbage collection
 
-        self.equation_canvas = FigureCanvasTkAgg(self.equation_figure, self.instructions_frame)
-        self.equation_widget = self.equation_canvas.get_tk_widget()
-        
         # Position in grid, but hide initially
-        self.equation_widget.grid(row=0, column=0, columnspan=2, pady=(130,80), sticky="n")
-        self.equation_widget.grid_remove() # Hide for now   
-        
-    def set_equation_text(self, latex_equation: str):
-        """Render the LaTeX equation text in the existing matplotlib figure."""
-        # Clear old text
-        self.equation_ax.clear()
-        self.equation_ax.axis('off')
-
-        # Render the new LaTeX equation
-        self.equation_ax.text(
-            0.5, 0.5,
-            latex_equation,
-            fontsize=16,
-            ha='center',
-            va='center',
-            transform=self.equation_ax.transAxes
-        )
-        self.equation_canvas.draw()
-        
-    def add_equation_widget2(self):
-        """Create a second matplotlib figure to display another LaTeX equation, then hide it initially."""
-        self.equation_figure2 = Figure(figsize=(3, 1), dpi=100)
-        self.equation_ax2 = self.equation_figure2.add_subplot(111)
-        self.equation_ax2.axis('off')  # Hide axes for a cleaner look
-
-        self.equation_canvas2 = FigureCanvasTkAgg(self.equation_figure2, self.instructions_frame)
-        self.equation_widget2 = self.equation_canvas2.get_tk_widget()
-        
-        # Position in the grid but hide for now
-        # Adjust row/column to your liking (e.g., row=2 or row=3)
-        self.equation_widget2.grid(row=0, column=0, columnspan=2, pady=(330, 80), sticky="n")
-        self.equation_widget2.grid_remove()  # Hide initially
-    
-    def set_equation_text2(self, latex_equation: str):
-        """Render the LaTeX equation text in the second matplotlib figure."""
-        self.equation_ax2.clear()
-        self.equation_ax2.axis('off')
-
-        self.equation_ax2.text(
-            0.5, 0.5,
-            latex_equation,
-            fontsize=16,
-            ha='center',
-            va='center',
-            transform=self.equation_ax2.transAxes
-        )
-        self.equation_canvas2.draw() 
-        
-    def add_equation_widget3(self):
-        """Create a second matplotlib figure to display another LaTeX equation, then hide it initially."""
-        self.equation_figure3 = Figure(figsize=(5, 1), dpi=100)
-        self.equation_ax3 = self.equation_figure3.add_subplot(111)
-        self.equation_ax3.axis('off')  # Hide axes for a cleaner look
-
-        self.equation_canvas3 = FigureCanvasTkAgg(self.equation_figure3, self.instructions_frame)
-        self.equation_widget3 = self.equation_canvas3.get_tk_widget()
-        
-        # Position in the grid but hide for now
-        # Adjust row/column to your liking (e.g., row=2 or row=3)
-        self.equation_widget3.grid(row=0, column=0, columnspan=2, pady=(80, 80), sticky="n")
-        self.equation_widget3.grid_remove()  # Hide initially
-    
-    def set_equation_text3(self, latex_equation: str):
-        """Render the LaTeX equation text in the second matplotlib figure."""
-        self.equation_ax3.clear()
-        self.equation_ax3.axis('off')
-
-        self.equation_ax3.text(
-            0.5, 0.5,
-            latex_equation,
-            fontsize=16,
-            ha='center',
-            va='center',
-            transform=self.equation_ax3.transAxes
-        )
-        self.equation_canvas3.draw() 
-    
-    def add_equation_widget4(self):
-        """Create a second matplotlib figure to display another LaTeX equation, then hide it initially."""
-        self.equation_figure4 = Figure(figsize=(5, 1), dpi=100)
-        self.equation_ax4 = self.equation_figure4.add_subplot(111)
-        self.equation_ax4.axis('off')  # Hide axes for a cleaner look
-
-        self.equation_canvas4 = FigureCanvasTkAgg(self.equation_figure4, self.instructions_frame)
-        self.equation_widget4 = self.equation_canvas4.get_tk_widget()
-        
-        # Position in the grid but hide for now
-        # Adjust row/column to your liking (e.g., row=2 or row=3)
-        self.equation_widget4.grid(row=0, column=0, columnspan=2, pady=(250, 200), sticky="n")
-        self.equation_widget4.grid_remove()  # Hide initially
-    
-    def set_equation_text4(self, latex_equation: str):
-        """Render the LaTeX equation text in the second matplotlib figure."""
-        self.equation_ax4.clear()
-        self.equation_ax4.axis('off')
-
-        self.equation_ax4.text(
-            0.5, 0.5,
-            latex_equation,
-            fontsize=16,
-            ha='center',
-            va='center',
-            transform=self.equation_ax4.transAxes
-        )
-        self.equation_canvas4.draw() 
-    
-    def add_equation_widget5(self):
-        """Create a second matplotlib figure to display another LaTeX equation, then hide it initially."""
-        self.equation_figure5 = Figure(figsize=(3, 1), dpi=100)
-        self.equation_ax5 = self.equation_figure5.add_subplot(111)
-        self.equation_ax5.axis('off')  # Hide axes for a cleaner look
-
-        self.equation_canvas5 = FigureCanvasTkAgg(self.equation_figure5, self.instructions_frame)
-        self.equation_widget5 = self.equation_canvas5.get_tk_widget()
-        
-        # Position in the grid but hide for now
-        # Adjust row/column to your liking (e.g., row=2 or row=3)
-        self.equation_widget5.grid(row=0, column=0, columnspan=2, pady=(380, 50), sticky="n")
-        self.equation_widget5.grid_remove()  # Hide initially
-    
-    def set_equation_text5(self, latex_equation: str):
-        """Render the LaTeX equation text in the second matplotlib figure."""
-        self.equation_ax5.clear()
-        self.equation_ax5.axis('off')
-
-        self.equation_ax5.text(
-            0.5, 0.5,
-            latex_equation,
-            fontsize=16,
-            ha='center',
-            va='center',
-            transform=self.equation_ax5.transAxes
-        )
-        self.equation_canvas5.draw() 
-    
+        widget.grid(row=0, column=0, columnspan=2, pady=pady, sticky="n")
+        widget.grid_remove()
+        return widget
+
     def reset_states(self):
         """Reset all states to their initial values."""
         # Reset variables
+        self.stop_pipeline()
+        self.export_timings()
+        self.stage_timer.reset()
         self.video = None
-        self.tracker = cv2.TrackerCSRT_create()
+        self.frame_proxy = None
+        self.frame_cache = None
+        self.frame_index_thread = None
+        self.frame_proxy_thread = None
+        self.track_cache = None
+        self.remove_droplets()
+        self.tracking_native = False
         self.current_frame = 0
         self.total_frames = 0
+        self.trajectory_length = 0
         self.frame_width = 0
         self.frame_height = 0
-        self.bbox = None
-        self.bbox_history = {}
-        self.y_centers = []
         self.charge_integer_pairs = []
-        self.batch_y_centers = []
+        self.stored_droplets = set()
         self.paused = True
 
         # Reset UI components
         self.video_canvas.delete("all")
         self.canvas_image = None
         self.progress_bar['value'] = 0
-        self.ax.clear()
-        self.chart_canvas.draw()
-        self.gauge_ax.clear()
-        self.gauge_chart_canvas.draw()
-        self.integer_ax.clear()
-        self.integer_chart_canvas.draw()
+        self.reset_charts()
         self.placeholder_label.pack(fill=tk.BOTH, expand=True) 
         self.prediction_sub_frame.pack_forget()
     
@@ -666,10 +795,9 @@ class MillikanExperimentApp:
             self.end_x = event.x
             self.end_y = event.y
             self.roi_selection = False
-            self.bbox = (self.start_x, self.start_y, self.end_x - self.start_x, self.end_y - self.start_y)
-            self.bbox
-            self.tracker.init(self.frame, self.bbox)
-            self.bbox_history[self.current_frame] = self.bbox
+            bbox = (self.start_x, self.start_y, self.end_x - self.start_x, self.end_y - self.start_y)
+            # Shift-drag adds a droplet to the ones already tracked, a plain drag starts over with this one
+            self.add_droplet(bbox, replace=not event.state & 0x0001)
 
         # Safely remove the slider
         if self.slider is not None:
@@ -677,11 +805,184 @@ class MillikanExperimentApp:
             self.slider.destroy()
             self.slider = None
 
+    def add_droplet(self, bbox, replace=True):
+        """Start tracking the droplet in bbox from the current frame, alongside the others unless replace."""
+        # The trackers are only updated while playing, so they all start from the same frame
+        self.pause_video()
+        if replace or not self.droplets:
+            self.remove_droplets()
+            # The droplets share the decoded frames, so they all track at the resolution chosen for the first
+            # A proxy only holds display-size frames, so there is no native resolution to crop from
+            self.tracking_native = self.crop_tracking.get() and self.frame_proxy is None
+        if self.tracking_native:
+            # Track in a window of the full-resolution frame; bboxes stay in display coordinates
+            tracker = CroppedTracker(
+                lambda: create_tracker(self.tracker_name.get()),
+                (self.frame_width, self.frame_height), (self.display_width, self.display_height),
+            )
+            tracker.init(self.read_native_frame(self.current_frame), bbox)
+        else:
+            tracker = create_tracker(self.tracker_name.get())
+            tracker.init(self.frame, bbox)
+
+        droplet = Droplet(tracker, self.trajectory_length, self.current_frame, bbox)
+        droplet.color, line_color = self.droplet_colors[len(self.droplets) % len(self.droplet_colors)]
+        if not self.droplets:
+            droplet.line = self.trajectory_line
+        else:
+            droplet.line, = self.ax.plot([], [], color=line_color)
+            self.chart_blitter.add_artist(droplet.line)
+        self.droplets.append(droplet)
+        self.load_cached_tracking(droplet)
+
+    def detect_droplets(self):
+        """Find the droplets that stay in view from the current frame on and track all of them."""
+        if self.video is None:
+            return
+        self.highlight_button(self.detect_button)
+        self.pause_video()
+        frames = []
+        for index in range(self.current_frame, min(self.total_frames, self.current_frame + self.droplet_detector.frames)):
+            frame = self.frame_cache.get(index)
+            if frame is None:
+                break
+            frames.append(frame)
+        proposals = self.droplet_detector.detect(frames) if frames else []
+        if not proposals:
+            messagebox.showinfo("No Droplets", "No droplet stays in view from this frame on. Select one by dragging instead.")
+            return
+
+        # The trackers start on the frame the proposals were detected on, whatever was drawn last
+        self.frame = frames[0]
+        for position, proposal in enumerate(proposals[:len(self.droplet_colors)]):
+            self.add_droplet(proposal['bbox'], replace=position == 0)
+        self.show_frame(self.frame, self.current_frame)
+
+        # Same as after drawing an ROI
+        if self.slider is not None:
+            self.slider.pack_forget()
+            self.slider.destroy()
+            self.slider = None
+
+    def remove_droplets(self):
+        """Stop tracking every droplet and take their extra lines off the chart."""
+        for droplet in self.droplets:
+            if droplet.line is not self.trajectory_line:
+                self.chart_blitter.remove_artist(droplet.line)
+                droplet.line.remove()
+        self.droplets = []
+        self.video_canvas.delete("droplet")
+        self.trajectory_line.set_data([], [])
+        self.peak_markers.set_data([], [])
+        self.trough_markers.set_data([], [])
+
+    def show_frame(self, frame, index, results=None):
+        """Show display frame index with the boxes of the droplets tracked on it."""
+        self.display_frame(frame)
+        self.draw_droplets(index, results)
+
+    def draw_droplets(self, index, results=None):
+        """Move every droplet's rectangle on the video canvas to its box on frame index.
+
+        results are the pipeline's (ok, bbox, score) per droplet for that frame, which may not be
+        recorded yet; droplets without a result there are drawn from their trajectories. The
+        boxes are canvas items over the frame, so frames are shown as they are, without a copy.
+        """
+        for position, droplet in enumerate(self.droplets):
+            if results is not None and results[position][0]:
+                bbox = results[position][1]
+            else:
+                bbox = droplet.trajectory.bbox(index)
+            if droplet.box is None:
+                droplet.box = self.video_canvas.create_rectangle(0, 0, 0, 0, outline=droplet.color, width=2, tags="droplet")
+            if bbox:
+                self.video_canvas.coords(droplet.box, bbox[0], bbox[1], bbox[0] + bbox[2], bbox[1] + bbox[3])
+                self.video_canvas.itemconfigure(droplet.box, state=tk.NORMAL)
+            else:
+                self.video_canvas.itemconfigure(droplet.box, state=tk.HIDDEN)
+
+    def read_native_frame(self, index):
+        """Decode frame index at the video's own resolution."""
+        self.frame_cache.seek(index)
+        ret, frame = self.video.read()
+        return frame if ret else None
+
+    def load_cached_tracking(self, droplet):
+        """Replay the trajectory of an earlier run with the same ROI and tracker instead of tracking again."""
+        cached = self.track_cache.load(droplet.roi_frame, droplet.roi, self.tracker_name.get(), self.tracking_native,
+                                       proxy=self.proxy_mode())
+        if cached is None:
+            return
+        frames, bboxes = cached
+        droplet.trajectory.record_many(frames, bboxes)
+        droplet.tracker = None  # The cached run covered the whole video
+
+        # Run the batches playback would have run, so the histogram gets the same per-batch
+        # estimates, but only draw the charts for the last one
+        end = droplet.trajectory.end
+        for batch_end in range(droplet.roi_frame + 1 + self.batch_size, end + 1, self.batch_size):
+            self.process_batch_data(droplet, batch_end, redraw=batch_end + self.batch_size > end)
+
+        # Other droplets still need tracking from the current frame
+        if any(other.tracker is not None for other in self.droplets):
+            return
+        # Every droplet came from the cache; show where they ended up
+        self.current_frame = max(other.trajectory.end for other in self.droplets) - 1
+        frame = self.frame_cache.get(self.current_frame)
+        if frame is not None:  # Otherwise the frame the ROI was drawn on stays up
+            self.frame = frame
+            self.show_frame(self.frame, self.current_frame)
+        self.progress_bar['value'] = 100
+
+    def save_tracking(self):
+        """Store the frames tracked since each ROI was drawn so reopening the video skips tracking."""
+        for droplet in self.droplets:
+            if droplet.tracker is None:
+                continue  # Already in the cache
+            frames = droplet.trajectory.frames(droplet.roi_frame + 1)
+            if len(frames) == 0:
+                continue
+            self.track_cache.save(droplet.roi_frame, droplet.roi, self.tracker_name.get(),
+                                  frames, droplet.trajectory.data['bbox'][frames], self.tracking_native,
+                                  proxy=self.proxy_mode())
+
+    def proxy_mode(self):
+        """Description of the frames tracked for the track cache; None when they are decoded from the video."""
+        return 'bgr' if self.frame_proxy is not None else None
+
+    def get_results_store(self):
+        if self.results_store is None:
+            self.results_store = ResultsStore()
+        return self.results_store
+
+    def store_results(self):
+        """Add the final estimate of every droplet of the video to the results store."""
+        results = []
+        for droplet in self.droplets:
+            if droplet.analysis is None or droplet.analysis[-1] is None:
+                continue
+            vu, vd = droplet.velocities
+            slope_up, slope_down = droplet.pixel_slopes
+            charge, integer = droplet.analysis[-2:]
+            results.append(dict(
+                video=self.video_path, roi=droplet.roi, roi_frame=droplet.roi_frame, vu=vu, vd=vd,
+                charge=charge, integer=integer, tracker=self.tracker_name.get(), crop=self.tracking_native,
+                droplet=self.droplets.index(droplet), calibration=self.charge_calculator.parameters(),
+                slope_up=slope_up, slope_down=slope_down,
+            ))
+            self.stored_droplets.add(droplet)
+        if results:
+            self.get_results_store().add_many(results)
+            self.stored_charges = None
+            if self.show_all_results.get():
+                self.refresh_charts()  # The droplets now count through the store
+
     def play_video(self):
         if self.paused:
             self.highlight_button(self.play_button)
             self.video_canvas.delete("roi")
             self.paused = False
+            self.start_pipeline()
             self.update_video_frame()
             self.play_button.config(state=tk.DISABLED)
             self.pause_button.config(state=tk.ACTIVE)
@@ -694,6 +995,8 @@ class MillikanExperimentApp:
         if not self.paused:
             self.highlight_button(self.pause_button)
             self.paused = True
+            self.stop_pipeline()
+            self.refresh_display()
             self.play_button.config(state=tk.ACTIVE)
             self.pause_button.config(state=tk.DISABLED)
             self.forward_button.config(state=tk.ACTIVE)
@@ -701,200 +1004,262 @@ class MillikanExperimentApp:
             self.fast_forward_button.config(state=tk.ACTIVE)
             self.fast_backward_button.config(state=tk.ACTIVE)
 
+    def start_pipeline(self):
+        """Start decoding and tracking on background threads from the frame after the current one."""
+        if not self.droplets or self.pipeline is not None:
+            return
+        # Every droplet is tracked against the same decoded frame, so decoding is paid once
+        self.pipeline = TrackingPipeline(
+            self.video, [droplet.tracker for droplet in self.droplets], self.current_frame + 1,
+            (self.display_width, self.display_height),
+            frame_cache=self.frame_cache, track_native=self.tracking_native, timer=self.stage_timer,
+            pace_fps=self.fps if self.playback_mode.get() == 'Real time' else None,
+        )
+        self.pipeline.start()
+
+    def stop_pipeline(self):
+        """Stop the background threads and take in whatever they finished tracking."""
+        if self.pipeline is None:
+            return
+        self.pipeline.stop()
+        self.consume_tracking_results()
+        self.pipeline = None
+
     def update_video_frame(self):
-        if not self.bbox:
+        if not self.droplets:
             messagebox.showinfo("Missed Step","Must select an area on the video first.")
             return
 
-        if self.paused or not self.video.isOpened():
+        if self.paused or self.pipeline is None:
             return
 
-        ret, self.frame = self.video.read()
-        if not ret:
+        # Fast mode only draws display_rate times a second and leaves the rest of the time to tracking
+        now = time.perf_counter()
+        fast = self.playback_mode.get() == 'Fast'
+        refresh = not fast or now - self.display_updated >= 1 / self.display_rate
+        if refresh:
+            self.display_updated = now
+        self.consume_tracking_results(refresh)
+        if self.stage_timer.enabled and now - self.hud_updated >= self.hud_interval:
+            self.update_hud()
+
+        if self.pipeline.finished:
+            self.stop_pipeline()
+            # The last frames may have arrived on a tick that Fast mode did not draw
+            self.refresh_display()
+            self.progress_bar['value'] = 100
+            self.save_tracking()
+            self.store_results()
+            self.export_timings()
             messagebox.showinfo("End of Video", "Video playback completed")
             return
 
-        self.frame = cv2.resize(self.frame, (self.display_width, self.display_height))
-        self.current_frame += 1
-        ret, bbox = self.tracker.update(self.frame)
-        if ret:
-            self.bbox_history[self.current_frame] = bbox
-            self.batch_y_centers.append((self.current_frame, bbox[1] + bbox[3] / 2))
-            p1 = (int(bbox[0]), int(bbox[1]))
-            p2 = (int(bbox[0] + bbox[2]), int(bbox[1] + bbox[3]))
-            cv2.rectangle(self.frame, p1, p2, (255, 0, 0), 2, 1)
+        if fast:
+            delay = int((self.display_updated + 1 / self.display_rate - time.perf_counter()) * 1000)
+            self.root.after(max(10, delay), self.update_video_frame)
+        else:
+            self.root.after(10, self.update_video_frame)
+
+    def consume_tracking_results(self, refresh=True):
+        """Record every frame tracked since the last call and, with refresh, display only the most recent one.
+
+        Without refresh the batches are analyzed but the display, the progress bar and the charts
+        are left for the next refresh.
+        """
+        for index, results in self.pipeline.get_results():
+            self.current_frame = index
+            self.stage_timer.mark('tracked')
+            for droplet, (ret, bbox, score) in zip(self.droplets, results):
+                if droplet.tracker is None:
+                    continue
+                if ret:
+                    droplet.trajectory.record(index, bbox, score)
+
+                # Update the batch when batch size is reached
+                if index + 1 - droplet.analyzed_end >= self.batch_size:
+                    self.process_batch_data(droplet, redraw=refresh)
+
+        if not refresh:
+            return
+        if self.charts_stale:
+            self.refresh_charts()
 
-        # Update the batch when batch size is reached
-        if len(self.batch_y_centers) >= self.batch_size:
-            self.process_batch_data()
-            self.batch_y_centers = [] 
+        latest = self.pipeline.get_latest_frame()
+        if latest is None:
+            return
 
-        
-        self.display_frame(self.frame)
+        index, self.frame, results = latest
+        with self.stage_timer.stage('display_frame'):
+            self.show_frame(self.frame, index, results)
+        self.stage_timer.mark('displayed')
 
         # Update the progress bar
         progress = (self.current_frame / self.total_frames) * 100
         self.progress_bar['value'] = progress
 
-        self.root.after(10, self.update_video_frame)
-
-    def process_batch_data(self):
-        """Process batch data using numpy for efficient computation."""
-        if len(self.batch_y_centers) == 0:
-            return
-
-        batch_array = np.array(self.batch_y_centers)
-        normalized_y_centers = batch_array[:, 1] / self.display_height
-        self.y_centers.extend(normalized_y_centers.tolist())
+    def process_batch_data(self, droplet, end=None, redraw=True):
+        """Extend a droplet's analysis to the frames tracked before end (default: up to the current frame)."""
+        end = self.current_frame + 1 if end is None else end
+        with self.stage_timer.stage('analysis'):
+            resamples = self.bootstrap_resamples if self.show_uncertainty.get() else 0
+            charge, integer = droplet.analyze(self.charge_calculator, end, resamples)[-2:]
+        if charge is not None:
+            self.record_prediction(charge, integer, droplet)
+            if redraw:
+                with self.stage_timer.stage('prediction_display'):
+                    self.update_prediction_display(charge, integer, droplet.uncertainty)
+        if redraw:
+            self.update_chart()
+        else:
+            self.charts_stale = True
+
+    def refresh_display(self):
+        """Draw the charts, the last tracked frame and the progress bar, whichever ticks were skipped."""
+        self.display_updated = time.perf_counter()
+        self.refresh_charts()
+        if self.frame is not None:
+            self.show_frame(self.frame, self.current_frame)
+        if self.total_frames:
+            self.progress_bar['value'] = (self.current_frame / self.total_frames) * 100
+
+    def refresh_charts(self):
+        """Draw the latest estimate and the trajectories of batches that were analyzed without drawing."""
+        if self.charge_integer_pairs:
+            charge, integer, _, droplet = self.charge_integer_pairs[-1]
+            with self.stage_timer.stage('prediction_display'):
+                self.update_prediction_display(charge, integer, droplet.uncertainty)
         self.update_chart()
 
     def update_chart(self):
-        """Find and plot peaks and troughs in y-center data, ensuring the first and last data points are treated as specified."""
-        y = np.array(self.y_centers) * 512  # Scale to pixel values
-        t = np.arange(len(self.y_centers))  # Time indices
-
-        # Use numpy functions to find peaks and troughs
-        peaks, _ = find_peaks(y, distance=100, prominence=100)
-        troughs, _ = find_peaks(-y, distance=100, prominence=100)
-
-        # Enforce the first and last frame conditions
-        if 0 not in troughs:
-            troughs = np.append([0], troughs)
-        if len(peaks) > 0 and len(troughs) > 0:
-            if peaks[-1] > troughs[-1]:
-                if len(y) - 1 not in troughs:
-                    troughs = np.append(troughs, [len(y) - 1])
-            else:
-                if len(y) - 1 not in peaks:
-                    peaks = np.append(peaks, [len(y) - 1])
-
-        # Create lists of tuples for peaks and troughs
-        peak_points = [(t[index], y[index]) for index in peaks]
-        trough_points = [(t[index], y[index]) for index in troughs]
-
-        try:
-            vu, vd = find_slopes(peak_points, trough_points)
-            charge, integer = self.charge_calculator.find_charge_and_integer(vu, vd)
-            self.update_prediction_display(charge, integer)
-        except ValueError as e:
-            pass
-
-        # Plotting
-        self.ax.clear()
-        self.ax.set_title('Detected Peaks and Troughs in Y-Center Data')
-        self.ax.set_xlabel('Frame Index')
-        self.ax.set_ylabel('Y-Center Value')
-        self.ax.grid(True)
-        self.ax.plot(t, y, label='Y-Center Data', color='black')
-        self.ax.plot(t[peaks], y[peaks], 'x', label='Peaks', color='blue')
-        self.ax.plot(t[troughs], y[troughs], 'bo', label='Troughs')
-        self.ax.invert_yaxis()
-        self.ax.legend()
-        self.chart_canvas.draw()
+        """Plot the y-centers of every droplet with the peaks and troughs found in them."""
+        with self.stage_timer.stage('chart_redraw'):
+            peaks_t, peaks_y, troughs_t, troughs_y = [[]], [[]], [[]], [[]]
+            for droplet in self.droplets:
+                if droplet.analysis is None:
+                    continue
+                t, y, peaks, troughs = droplet.analysis[:4]
+                droplet.line.set_data(t, y)
+                peaks_t.append(t[peaks])
+                peaks_y.append(y[peaks])
+                troughs_t.append(t[troughs])
+                troughs_y.append(y[troughs])
+            self.peak_markers.set_data(np.concatenate(peaks_t), np.concatenate(peaks_y))
+            self.trough_markers.set_data(np.concatenate(troughs_t), np.concatenate(troughs_y))
+            self.chart_blitter.update()
+        self.charts_stale = False
+
+    def toggle_hud(self):
+        """Start or stop timing the playback stages and showing them on the video canvas."""
+        self.stage_timer.enabled = self.show_hud.get()
+        if self.stage_timer.enabled:
+            self.update_hud()
+        else:
+            self.video_canvas.delete("hud")
+
+    def update_hud(self):
+        """Draw the effective frame rates and the rolling p50/p95/p99 of each stage over the video."""
+        self.hud_updated = time.perf_counter()
+        displayed = self.stage_timer.rate('displayed')
+        tracked = self.stage_timer.rate('tracked')
+        lines = [f"display {displayed or 0:5.1f} fps   tracking {tracked or 0:5.1f} fps",
+                 f"{'stage':<18}{'p50':>7}{'p95':>7}{'p99':>7} ms"]
+        for name, stats in self.stage_timer.stats().items():
+            lines.append(f"{name:<18}{stats['p50_ms']:7.2f}{stats['p95_ms']:7.2f}{stats['p99_ms']:7.2f}")
+
+        self.video_canvas.delete("hud")
+        text = self.video_canvas.create_text(6, 6, anchor=tk.NW, text="\n".join(lines), fill="yellow",
+                                             font=("Courier", 9), tags="hud")
+        background = self.video_canvas.create_rectangle(self.video_canvas.bbox(text), fill="black", outline="", tags="hud")
+        self.video_canvas.tag_lower(background, text)
+
+    def export_timings(self):
+        """Write the stage timings of the session that is ending to the video's output directory."""
+        if not self.stage_timer.counts or not self.output_path:
+            return
+        for extension in ('json', 'csv'):
+            path = os.path.join(self.output_path, f"stage_timings.{extension}")
+            self.stage_timer.export(path)
+
+    def record_prediction(self, charge, integer, droplet):
+        """Add a batch's estimate to the histogram data, tagged with its droplet and frame so rewinding can drop it."""
+        if charge and integer:
+            self.charge_integer_pairs.append((charge, integer, droplet.analyzed_end, droplet))
+
+    def discard_after(self, index):
+        """Forget the tracking results after frame index, so playing on tracks those frames again."""
+        for droplet in self.droplets:
+            if droplet.tracker is None:
+                continue  # Trajectories from the cache are complete and never tracked again
+            if droplet.discard_after(index, self.batch_size):
+                # Drop the droplet's estimates made after its last complete batch
+                self.charge_integer_pairs = [
+                    pair for pair in self.charge_integer_pairs
+                    if pair[3] is not droplet or pair[2] <= droplet.analyzed_end
+                ]
 
     def display_frame(self, frame):
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(frame)
-        imgtk = ImageTk.PhotoImage(image=img)
-        if self.canvas_image is None:
-            self.canvas_image = self.video_canvas.create_image(0, 0, anchor=tk.NW, image=imgtk)
+        """Put a BGR display frame on the video canvas, updating the same Tk photo in place."""
+        height, width = frame.shape[:2]
+        if self.rgba_buffer is None or self.rgba_buffer.shape[:2] != (height, width):
+            # PIL maps an RGBA buffer without copying it, so converting into the buffer updates the image
+            self.rgba_buffer = np.empty((height, width, 4), dtype=np.uint8)
+            self.rgba_image = Image.frombuffer('RGBA', (width, height), self.rgba_buffer, 'raw', 'RGBA', 0, 1)
+            self.photo_image = None
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=self.rgba_buffer)
+
+        if self.photo_image is None:
+            self.photo_image = ImageTk.PhotoImage(image=self.rgba_image)
+            if self.canvas_image is not None:
+                self.video_canvas.itemconfig(self.canvas_image, image=self.photo_image)
         else:
-            self.video_canvas.itemconfig(self.canvas_image, image=imgtk)
-        self.video_canvas.image = imgtk
+            self.photo_image.paste(self.rgba_image)
+        if self.canvas_image is None:
+            self.canvas_image = self.video_canvas.create_image(0, 0, anchor=tk.NW, image=self.photo_image)
+            self.video_canvas.tag_lower(self.canvas_image)
 
     def move_forward(self):
         if self.current_frame < self.total_frames - 1:
             self.highlight_button(self.forward_button)
             self.current_frame += 1
-            self.video.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame)
-            ret, frame = self.video.read()
-            if ret:
-                frame = cv2.resize(frame, (self.display_width, self.display_height))
-                bbox = self.bbox_history.get(self.current_frame, None)
-                if bbox:
-                    p1 = (int(bbox[0]), int(bbox[1]))
-                    p2 = (int(bbox[0] + bbox[2]), int(bbox[1] + bbox[3]))
-                    cv2.rectangle(frame, p1, p2, (255, 0, 0), 2, 1)
-                self.display_frame(frame)
+            frame = self.frame_cache.get(self.current_frame)
+            if frame is not None:
+                self.frame = frame
+                self.show_frame(frame, self.current_frame)
 
     def move_backward(self):
         if self.current_frame > 0:
             self.highlight_button(self.backward_button)
             self.current_frame -= 1
-            self.video.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame)
-            ret, frame = self.video.read()
-            if ret:
-                frame = cv2.resize(frame, (self.display_width, self.display_height))
-                bbox = self.bbox_history.get(self.current_frame, None)
-                if bbox:
-                    p1 = (int(bbox[0]), int(bbox[1]))
-                    p2 = (int(bbox[0] + bbox[2]), int(bbox[1] + bbox[3]))
-                    cv2.rectangle(frame, p1, p2, (255, 0, 0), 2, 1)
-                self.display_frame(frame)
-                
+            frame = self.frame_cache.get(self.current_frame)
+            if frame is not None:
+                self.frame = frame
+                self.show_frame(frame, self.current_frame)
+
                 # Handle data removal
-                if len(self.batch_y_centers) > 0:
-                    # Remove the last element from the batch
-                    self.batch_y_centers.pop()
-                elif len(self.y_centers) > 0:
-                    # Remove from y_centers if batch is empty
-                    self.y_centers.pop()
-                    # Remove from charge_interval_pairs only if we've gone backward by more than a batch
-                    if self.current_frame % self.batch_size == 0 and len(self.charge_integer_pairs) > 0:
-                        self.charge_integer_pairs.pop()
-                
-                # Update bbox history
-                if self.current_frame in self.bbox_history:
-                    del self.bbox_history[self.current_frame]
+                self.discard_after(self.current_frame)
 
 
     def move_fast_forward(self):
         if self.current_frame < self.total_frames - 1:
             self.highlight_button(self.fast_backward_button)
-            self.current_frame += 10
-            self.video.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame)
-            ret, frame = self.video.read()
-            if ret:
-                frame = cv2.resize(frame, (self.display_width, self.display_height))
-                bbox = self.bbox_history.get(self.current_frame, None)
-                if bbox:
-                    p1 = (int(bbox[0]), int(bbox[1]))
-                    p2 = (int(bbox[0] + bbox[2]), int(bbox[1] + bbox[3]))
-                    cv2.rectangle(frame, p1, p2, (255, 0, 0), 2, 1)
-                self.display_frame(frame)
+            self.current_frame = min(self.total_frames - 1, self.current_frame + 10)
+            frame = self.frame_cache.get(self.current_frame)
+            if frame is not None:
+                self.frame = frame
+                self.show_frame(frame, self.current_frame)
 
     def move_fast_backward(self):
         if self.current_frame > 0:
             self.highlight_button(self.fast_backward_button)
             frames_to_skip = 10  # Define how many frames to skip backward
             self.current_frame = max(0, self.current_frame - frames_to_skip)
-            self.video.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame)
-            ret, frame = self.video.read()
-            if ret:
-                frame = cv2.resize(frame, (self.display_width, self.display_height))
-                bbox = self.bbox_history.get(self.current_frame, None)
-                if bbox:
-                    p1 = (int(bbox[0]), int(bbox[1]))
-                    p2 = (int(bbox[0] + bbox[2]), int(bbox[1] + bbox[3]))
-                    cv2.rectangle(frame, p1, p2, (255, 0, 0), 2, 1)
-                self.display_frame(frame)
+            frame = self.frame_cache.get(self.current_frame)
+            if frame is not None:
+                self.frame = frame
+                self.show_frame(frame, self.current_frame)
             
             # Handle data removal
-            for _ in range(frames_to_skip):
-                if len(self.batch_y_centers) > 0:
-                    # Remove the last element from the batch
-                    self.batch_y_centers.pop()
-                elif len(self.y_centers) > 0:
-                    # Remove from y_centers if batch is empty
-                    self.y_centers.pop()
-                    # Remove from charge_interval_pairs if backward movement crosses batch boundaries
-                    if self.current_frame % self.batch_size == 0 and len(self.charge_integer_pairs) > 0:
-                        self.charge_integer_pairs.pop()
-            
-            # Update bbox history
-            for frame_idx in range(self.current_frame, self.current_frame + frames_to_skip):
-                if frame_idx in self.bbox_history:
-                    del self.bbox_history[frame_idx]
+            self.discard_after(self.current_frame)
 
     def highlight_button(self, button):
         # Reset all buttons to their default style
@@ -920,20 +1285,15 @@ class MillikanExperimentApp:
         
         if self.video and not self.paused:  # Pause video if it's playing
             self.paused = True
+            self.stop_pipeline()
 
         self.current_frame = int(value)
-        self.video.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame)
-        ret, frame = self.video.read()
-        if ret:
-            frame = cv2.resize(frame, (self.display_width, self.display_height))
-            bbox = self.bbox_history.get(self.current_frame, None)
-            if bbox:
-                p1 = (int(bbox[0]), int(bbox[1]))
-                p2 = (int(bbox[0] + bbox[2]), int(bbox[1] + bbox[3]))
-                cv2.rectangle(frame, p1, p2, (255, 0, 0), 2, 1)
-            self.display_frame(frame)
+        frame = self.frame_cache.get(self.current_frame)
+        if frame is not None:
+            self.frame = frame
+            self.show_frame(frame, self.current_frame)
 
-    def update_prediction_display(self, charge, integer):
+    def update_prediction_display(self, charge, integer, uncertainty=None):
         """Update the gauge and bar chart with new prediction values or switch from placeholder."""
         if not charge or not integer:
             self.placeholder_label.pack(fill=tk.BOTH, expand=True)  
@@ -944,24 +1304,30 @@ class MillikanExperimentApp:
         self.prediction_sub_frame.pack(fill=tk.BOTH, expand=True)  
 
         # Update the gauge and integer chart
-        self.update_gauge(charge)
+        self.update_gauge(charge, uncertainty)
         self.update_integer_chart(charge, integer)
 
-    def update_gauge(self, charge):
-        """Update the vertical gauge using matplotlib."""
-        max_charge = 1e-18  # Adjust maximum for better scaling
-        normalized_charge = min(charge / max_charge, 1.0)
-
-        # Clear the previous gauge
-        self.gauge_ax.clear()
-
-        # Plot the vertical bar
-        self.gauge_ax.bar(
-            [0],  
-            [normalized_charge * max_charge],  
-            width=0.4, color="blue", edgecolor="black"
+    def setup_chart(self):
+        """Create the y-center chart once, with fixed limits so only its data artists ever change."""
+        self.ax.set_title('Detected Peaks and Troughs in Y-Center Data')
+        self.ax.set_xlabel('Frame Index')
+        self.ax.set_ylabel('Y-Center Value')
+        self.ax.grid(True)
+        self.trajectory_line, = self.ax.plot([], [], label='Y-Center Data', color='black')
+        self.peak_markers, = self.ax.plot([], [], 'x', label='Peaks', color='blue')
+        self.trough_markers, = self.ax.plot([], [], 'bo', label='Troughs')
+        self.ax.set_xlim(0, 1)
+        self.ax.set_ylim(self.display_height, 0)  # Inverted, like image rows
+        self.ax.legend()
+        self.chart_blitter = BlitManager(
+            self.chart_canvas, [self.trajectory_line, self.peak_markers, self.trough_markers], bbox=self.ax.bbox
         )
 
+    def setup_gauge(self):
+        """Create the vertical charge gauge once."""
+        max_charge = 1e-18  # Adjust maximum for better scaling
+        self.gauge_bar = self.gauge_ax.bar([0], [0], width=0.4, color="blue", edgecolor="black")[0]
+
         # Add labels and formatting
         self.gauge_ax.set_ylim(0, max_charge)  
         self.gauge_ax.set_xlim(-1.0, 1.0)
@@ -969,58 +1335,143 @@ class MillikanExperimentApp:
         self.gauge_ax.set_ylabel("q = Charge (C)", fontsize=8)
         self.gauge_ax.tick_params(axis="y", labelsize=8)
         self.gauge_ax.grid(True, axis="y", linestyle="--", alpha=0.6)
-
-        # Set a title with the charge value
-        self.gauge_ax.set_title(
-            f"q = {charge:.2e} C", fontsize=10, color="blue", pad=15
-        )
+        self.gauge_title = self.gauge_ax.set_title("", fontsize=10, color="blue", pad=15)
+        # 95% interval of the charge as an error bar on the gauge, with the q/e interval next to it
+        self.gauge_interval, = self.gauge_ax.plot([], [], color="red", marker="_", markersize=12, linewidth=2)
+        self.gauge_interval_label = self.gauge_ax.text(0.5, 0.97, "", transform=self.gauge_ax.transAxes,
+                                                       fontsize=7, color="red", ha="center", va="top")
 
         # Adjust layout to ensure no clipping
         self.gauge_figure.subplots_adjust(left=0.3, right=.95, top=0.8, bottom=0.1)
+        self.gauge_blitter = BlitManager(
+            self.gauge_chart_canvas, [self.gauge_bar, self.gauge_title, self.gauge_interval, self.gauge_interval_label]
+        )
 
-        # Redraw the gauge
-        self.gauge_chart_canvas.draw()
-
-    def update_integer_chart(self, charge, integer):
-        """Update the histogram for integer observations."""
-        self.integer_ax.clear()
-
-        if integer is not None:
-            self.charge_integer_pairs.append((charge, integer))
-
-        # Convert integers to numpy array
-        integers = np.array([pair[1] for pair in self.charge_integer_pairs])
-
-        # Calculate histogram bins and counts using numpy
-        bins = np.linspace(np.min(integers), np.max(integers), 11)
-        counts, edges = np.histogram(integers, bins=bins)
-
-        # Find the bin with the highest count (mode bin)
-        max_count_index = np.argmax(counts)
-        mode_bin = (edges[max_count_index] + edges[max_count_index + 1]) / 2  # Calculate bin center
-
-        # Plot histogram
-        self.integer_ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color="blue", edgecolor="black", alpha=0.7)
-
-        # Add line for the mode bin
-        self.integer_ax.axvline(x=mode_bin, color="red", linestyle="--", linewidth=1)
+    def setup_integer_chart(self):
+        """Create the histogram bars, mode line and annotation once."""
+        self.integer_bars = self.integer_ax.bar(
+            np.arange(10), np.zeros(10), width=1, align="edge", color="blue", edgecolor="black", alpha=0.7
+        )
+        self.mode_line = self.integer_ax.axvline(x=0, color="red", linestyle="--", linewidth=1)
 
         # Set titles and labels
         self.integer_ax.set_title("Histogram of Integers", fontsize=10)
         self.integer_ax.set_xlabel("q/e = Integer", fontsize=8)
         self.integer_ax.set_ylabel("Count", fontsize=8)
         self.integer_ax.grid(True)
-
-        # Annotate the mode bin
-        self.integer_ax.annotate(
-            f"Electron Count: {round(mode_bin)}",
+        self.integer_annotation = self.integer_ax.annotate(
+            "",
             xy=(0.5, 1.25), xycoords='axes fraction',
             fontsize=10, color="red", ha="center"
         )
 
         self.integer_figure.tight_layout()
         self.integer_ax.tick_params(axis='both', which='major', labelsize=8)
-        self.integer_chart_canvas.draw()
+        self.integer_blitter = BlitManager(
+            self.integer_chart_canvas, list(self.integer_bars) + [self.mode_line, self.integer_annotation]
+        )
+
+    def reset_charts(self):
+        """Empty the live figures and redraw their static parts."""
+        self.trajectory_line.set_data([], [])
+        self.peak_markers.set_data([], [])
+        self.trough_markers.set_data([], [])
+        self.ax.set_xlim(0, max(1, self.total_frames))
+        self.chart_blitter.redraw()
+
+        self.gauge_bar.set_height(0)
+        self.gauge_title.set_text("")
+        self.gauge_interval.set_data([], [])
+        self.gauge_interval_label.set_text("")
+        self.gauge_blitter.redraw()
+
+        for bar in self.integer_bars:
+            bar.set_height(0)
+        self.mode_line.set_visible(False)
+        self.integer_annotation.set_text("")
+        self.integer_ax.set_xlim(0, 1)
+        self.integer_ax.set_ylim(0, 1)
+        self.integer_blitter.redraw()
+
+    def update_gauge(self, charge, uncertainty=None):
+        """Update the vertical gauge using matplotlib, with the 95% intervals of q and q/e when they were bootstrapped."""
+        max_charge = 1e-18  # Adjust maximum for better scaling
+        normalized_charge = min(charge / max_charge, 1.0)
+
+        self.gauge_bar.set_height(normalized_charge * max_charge)
+        self.gauge_title.set_text(f"q = {charge:.2e} C")
+        if uncertainty is not None:
+            (charge_low, charge_high), (integer_low, integer_high) = uncertainty
+            self.gauge_interval.set_data([0, 0], [charge_low, charge_high])
+            self.gauge_interval_label.set_text(f"95%: q/e {integer_low:.2f} to {integer_high:.2f}")
+        else:
+            self.gauge_interval.set_data([], [])
+            self.gauge_interval_label.set_text("")
+
+        # Redraw only the bar and the title
+        self.gauge_blitter.update()
+
+    def update_integer_chart(self, charge, integer):
+        """Update the histogram for integer observations."""
+        if self.show_all_results.get():
+            # The stored droplets of every session plus the latest estimate of this session's other droplets,
+            # from the store's running histogram instead of from the individual values
+            latest = {}
+            for pair in self.charge_integer_pairs:
+                if pair[3] not in self.stored_droplets:
+                    latest[pair[3]] = pair[:2]
+            store = self.get_results_store()
+            counts, edges = store.histogram(extra=[pair[1] for pair in latest.values()], bars=len(self.integer_bars))
+            if self.stored_charges is None:
+                self.stored_charges = store.charges()
+            charges = np.concatenate([self.stored_charges, [pair[0] for pair in latest.values()]])
+        else:
+            # Convert integers to numpy array
+            integers = np.array([pair[1] for pair in self.charge_integer_pairs])
+
+            # Calculate histogram bins and counts using numpy
+            bins = np.linspace(np.min(integers), np.max(integers), 11)
+            counts, edges = np.histogram(integers, bins=bins)
+            # e is estimated from the same per-batch estimates the histogram counts
+            charges = [pair[0] for pair in self.charge_integer_pairs]
+        if len(counts) == 0:
+            return
+
+        # Find the bin with the highest count (mode bin)
+        max_count_index = np.argmax(counts)
+        mode_bin = (edges[max_count_index] + edges[max_count_index + 1]) / 2  # Calculate bin center
+
+        for bar, left, width, count in zip(self.integer_bars, edges[:-1], np.diff(edges), counts):
+            bar.set_x(left)
+            bar.set_width(width)
+            bar.set_height(count)
+        self.mode_line.set_xdata([mode_bin, mode_bin])
+        self.mode_line.set_visible(True)
+
+        # Annotate the mode bin, and with enough charges the quantum that best explains all of them
+        annotation = f"Electron Count: {round(mode_bin)}"
+        try:
+            estimate = self.charge_estimator.estimate(charges)
+            annotation += f"   e = {estimate['elementary_charge']:.3e} C"
+        except ValueError:
+            pass  # Fewer than two positive charges so far
+        self.integer_annotation.set_text(annotation)
+
+        # Axis limits grow with headroom, so a full redraw is only needed when the data outgrows them
+        xmin, xmax = self.integer_ax.get_xlim()
+        limits_changed = False
+        if edges[0] < xmin or edges[-1] > xmax or xmax - xmin > 4 * max(1.0, edges[-1] - edges[0]):
+            padding = max(1.0, (edges[-1] - edges[0]) * 0.25)
+            self.integer_ax.set_xlim(edges[0] - padding, edges[-1] + padding)
+            limits_changed = True
+        if counts.max() > self.integer_ax.get_ylim()[1]:
+            self.integer_ax.set_ylim(0, counts.max() * 2)
+            limits_changed = True
+
+        if limits_changed:
+            self.integer_blitter.redraw()
+        else:
+            self.integer_blitter.update()
 
 
 if __name__ == "__main__":
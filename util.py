@@ -1,3 +1,5 @@
+import hashlib
+import os
 import cv2
 import numpy as np
 
@@ -7,7 +9,53 @@ def extract_video_properties(video):
     frame_height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
     return total_frames, frame_width, frame_height
 
-def find_slopes(peaks, troughs):
+def file_hash(path, chunk_size=1 << 20):
+    """Identify a file by its size and its first and last megabyte, without reading all of it."""
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(chunk_size))
+        if size > chunk_size:
+            f.seek(max(chunk_size, size - chunk_size))
+            digest.update(f.read(chunk_size))
+    return digest.hexdigest()[:16]
+
+def output_dir_for(video_path):
+    """Directory under output/ where results and caches for a video are kept."""
+    return os.path.join('output', os.path.basename(video_path).split('.')[0])
+
+def find_peaks_and_troughs(y):
+    """Find peaks and troughs in y-center data, treating the first and last data points as turning points."""
+    # scipy.signal takes over a second to import, so it is loaded on the first analysis, not at startup
+    from scipy.signal import find_peaks
+    peaks, _ = find_peaks(y, distance=100, prominence=100)
+    troughs, _ = find_peaks(-y, distance=100, prominence=100)
+    return add_end_points(peaks, troughs, len(y))
+
+def add_end_points(peaks, troughs, length):
+    """Treat the first data point as a trough and the last one as the opposite of the last turning point."""
+    if 0 not in troughs:
+        troughs = np.append([0], troughs)
+    if len(peaks) > 0 and len(troughs) > 0:
+        if peaks[-1] > troughs[-1]:
+            if length - 1 not in troughs:
+                troughs = np.append(troughs, [length - 1])
+        else:
+            if length - 1 not in peaks:
+                peaks = np.append(peaks, [length - 1])
+
+    return peaks, troughs
+
+def find_slopes(peaks, troughs, fps=30, calibration=414.20):
+    """Return (vu, vd) in m/s from the peak and trough points of a trajectory, for a video at fps and calibration px/mm."""
+    return convert_to_mm_per_sec(*find_pixel_slopes(peaks, troughs), fps, calibration)
+
+def find_pixel_slopes(peaks, troughs):
+    """Return the median negative and positive slopes (those of vu and vd), in pixels per frame, between consecutive turning points.
+
+    They are what the velocities are made of before any calibration, so they can be kept and
+    converted again under other calibrations without going back to the trajectory.
+    """
     points = sorted(peaks + troughs, key=lambda x: x[0])
 
     # Calculate slopes between consecutive points
@@ -30,10 +78,98 @@ def find_slopes(peaks, troughs):
     neg_slope_median = np.median(negative_slopes) if negative_slopes else 0
     pos_slope_median = np.median(positive_slopes) if positive_slopes else 0
 
-    return convert_to_mm_per_sec(neg_slope_median, pos_slope_median, 30, 414.20)
+    return neg_slope_median, pos_slope_median
+
+def find_leg_pixel_slopes(t, y, turning_points):
+    """Like find_pixel_slopes, but from a line fitted to the samples strictly between consecutive turning points.
+
+    With sparse samples (strided tracking) the sample nearest a turn may already lie on the next
+    leg, which biases slopes taken between the turning points themselves; a fit to the inside
+    of each leg does not depend on where the turn happened to be sampled.
+    """
+    positive_slopes = []
+    negative_slopes = []
+    for start, end in zip(turning_points[:-1], turning_points[1:]):
+        inside = (t > start) & (t < end)
+        if np.count_nonzero(inside) < 2:
+            continue
+        slope = np.polyfit(t[inside], y[inside], 1)[0]
+        if slope > 0:
+            positive_slopes.append(slope)
+        else:
+            negative_slopes.append(slope)
+
+    neg_slope_median = np.median(negative_slopes) if negative_slopes else 0
+    pos_slope_median = np.median(positive_slopes) if positive_slopes else 0
+
+    return neg_slope_median, pos_slope_median
+
+def bootstrap_velocities(t, y, turning_points, resamples=1000, center=None, rng=None, fps=30, calibration=414.20):
+    """Bootstrap replicates of (vu, vd) in m/s, as two arrays with one entry per resample.
+
+    A line is fitted to the samples strictly inside each leg between consecutive turning points.
+    Every replicate refits all legs to their fitted line plus residuals drawn with replacement
+    from the same leg, then draws the rising and the falling legs with replacement and takes the
+    median slope of each direction, like find_slopes. The replicates so reflect both the
+    tracking noise within a leg and the variation between legs. All replicates are computed as
+    array operations over a resamples x samples array, without a loop over resamples.
+
+    center is the (vu, vd) actually reported, e.g. by find_slopes; the replicates are scaled
+    so their medians match it, so intervals describe the spread around the reported value
+    rather than around the leg fits.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    legs = []
+    for start, end in zip(turning_points[:-1], turning_points[1:]):
+        inside = np.flatnonzero((t > start) & (t < end))
+        if len(inside) >= 3:  # A line through two samples leaves no residuals to draw
+            legs.append(inside)
+    if not legs:
+        raise ValueError("No leg between turning points has enough samples to bootstrap")
+
+    samples = np.concatenate(legs)
+    lengths = np.array([len(leg) for leg in legs])
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    leg_of = np.repeat(np.arange(len(legs)), lengths)
+    t = t[samples]
+    y = y[samples]
+
+    # Least-squares line of every leg from per-leg sums
+    centered = t - (np.add.reduceat(t, offsets) / lengths)[leg_of]
+    sxx = np.add.reduceat(centered * centered, offsets)
+    slopes = np.add.reduceat(centered * y, offsets) / sxx
+    fitted = (np.add.reduceat(y, offsets) / lengths)[leg_of] + slopes[leg_of] * centered
+    residuals = y - fitted
+
+    # Residuals drawn from their own leg; the fitted line contributes its own slope to every refit.
+    # The draws are made in float32 and int32, which halves the memory traffic of the largest arrays
+    draws = rng.random((resamples, len(samples)), dtype=np.float32)
+    draws *= lengths[leg_of].astype(np.float32)
+    draws = draws.astype(np.int32)
+    draws += offsets[leg_of].astype(np.int32)
+    drawn = residuals[draws]
+    drawn *= centered
+    replicates = slopes + np.add.reduceat(drawn, offsets, axis=1) / sxx
+
+    def median_slopes(direction):
+        columns = np.flatnonzero(direction)
+        if len(columns) == 0:
+            return np.zeros(resamples)
+        picks = columns[rng.integers(0, len(columns), (resamples, len(columns)))]
+        return np.median(np.take_along_axis(replicates, picks, axis=1), axis=1)
+
+    vu, vd = convert_to_mm_per_sec(median_slopes(slopes <= 0), median_slopes(slopes > 0), fps, calibration)
+    if center is not None:
+        for samples, value in zip((vu, vd), center):
+            middle = np.median(samples)
+            if middle > 0:
+                samples *= value / middle
+    return vu, vd
 
 def convert_to_mm_per_sec(negative, positive, fps, calibration):
     # Convert slopes to mm/s
     negative = np.abs((negative * fps) / calibration)
     positive = np.abs((positive * fps) / calibration)
-    return negative * 1e-3, positive * 1e-3  # Convert to m/s
\ No newline at end of file
+    return negative * 1e-3, positive * 1e-3  # Convert to m/s